@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import unittest
+from collections.abc import Iterable, Sequence
+from random import Random
+from time import perf_counter
+from typing import Union
+
+import dancing_links_root as dlinks
+import polycube as polyc
+import polyomino as polym
+import problem_spec as spec
+from subtree_search import SubtreeSearch, WorkUnit
+
+# Budgeted searches check the clock every this many nodes.
+TIME_CHECK_NODES = 200
+
+Placement = Union[spec.Shape, Sequence[spec.Coordinates]]
+
+
+class Completions:
+    def __init__(self, num_solutions: int, num_nodes: int, complete: bool) -> None:
+        # num_solutions is exact if the search was complete, and otherwise a lower
+        # bound: the search stopped at its budget or at enough solutions.
+        self.num_solutions = num_solutions
+        self.num_nodes = num_nodes
+        self.complete = complete
+
+    def __str__(self) -> str:
+        bound = "" if self.complete else "at least "
+        return f"{bound}{self.num_solutions} completions ({self.num_nodes} nodes)"
+
+    @property
+    def extendable(self) -> bool | None:
+        # None if the budget ran out before finding out.
+        if self.num_solutions > 0:
+            return True
+        return False if self.complete else None
+
+
+class Hint:
+    def __init__(
+        self,
+        row: int,
+        item: object,
+        completions: Completions,
+        estimate: dlinks.SearchTreeEstimate | None = None,
+    ) -> None:
+        self.row = row
+        self.item = item
+        # Completions after this placement: exact if complete, and otherwise a lower
+        # bound, with an estimate from random probes if one was made.
+        self.num_completions = completions.num_solutions
+        self.complete = completions.complete
+        self.estimate = estimate
+        self.num_nodes = completions.num_nodes
+
+    def __str__(self) -> str:
+        return f"Hint({self.item}, score {self.score:.4g})"
+
+    # Hints are ranked by score, then subtree size: the exact or estimated number
+    # of completions, and nodes below the placement.
+    @property
+    def score(self) -> float:
+        if self.estimate is None:
+            return self.num_completions
+        return self.estimate.num_solutions
+
+    @property
+    def subtree_size(self) -> float:
+        if self.estimate is None:
+            return self.num_nodes
+        return self.estimate.num_nodes
+
+
+# The nodes and time left to one query, shared by all the searches it makes.
+class _Budget:
+    def __init__(self, max_nodes: int | None, time_limit: float | None) -> None:
+        self.nodes_left = max_nodes
+        self.deadline = None if time_limit is None else perf_counter() + time_limit
+
+    def share(self, num_shares: int) -> _Budget:
+        # An even share of what is left, to be spent back with spend.
+        share = _Budget(None, None)
+        if self.nodes_left is not None:
+            share.nodes_left = max(self.nodes_left, 0) // num_shares
+        if self.deadline is not None:
+            now = perf_counter()
+            share.deadline = now + max(self.deadline - now, 0) / num_shares
+        return share
+
+    def next_slice(self) -> int:
+        if self.nodes_left is None:
+            return TIME_CHECK_NODES
+        return min(TIME_CHECK_NODES, self.nodes_left)
+
+    def spend(self, num_nodes: int) -> None:
+        if self.nodes_left is not None:
+            self.nodes_left -= num_nodes
+
+    @property
+    def exhausted(self) -> bool:
+        return (self.nodes_left is not None and self.nodes_left <= 0) or (
+            self.deadline is not None and perf_counter() > self.deadline
+        )
+
+
+# Answers "can these placements still be completed, and what could go next?" on one
+# prepared problem. The placements are forced by covering their rows' columns, the
+# searches of each query are limited by a node count and a time limit between them,
+# and the matrix is always restored afterwards, so the same Root serves any number
+# of queries. Results not cut short by the budget are memoized by the set of
+# placements, which does not depend on the order they were made in.
+class HintEngine:
+    def __init__(
+        self,
+        root: dlinks.Root,
+        max_nodes: int | None = 100_000,
+        time_limit: float | None = None,
+    ) -> None:
+        self.root = root
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.rows = {item: row for row, item in enumerate(root.items)}
+        self.cache: dict[tuple[frozenset[int], int | None], Completions] = {}
+
+    def __str__(self) -> str:
+        return f"HintEngine({len(self.rows)} placements, {len(self.cache)} cached)"
+
+    def rows_of(self, placements: Iterable[Placement]) -> list[int]:
+        rows = []
+        for placement in placements:
+            if not isinstance(placement, (polyc.Polycube, polym.Polyomino)):
+                placement = spec.to_shape(placement)
+            row = self.rows.get(placement, None)
+            if row is None:
+                raise ValueError(f"Not a placement of this problem: {placement}")
+            rows.append(row)
+        return rows
+
+    def completions(
+        self, placements: Iterable[Placement], max_solutions: int | None = None
+    ) -> Completions:
+        return self._completions(
+            self.rows_of(placements), max_solutions, self._new_budget()
+        )
+
+    def is_extendable(self, placements: Iterable[Placement]) -> bool | None:
+        return self.completions(placements, 1).extendable
+
+    def _new_budget(self) -> _Budget:
+        return _Budget(self.max_nodes, self.time_limit)
+
+    def _completions(
+        self, rows: Sequence[int], max_solutions: int | None, budget: _Budget
+    ) -> Completions:
+        key = (frozenset(rows), max_solutions)
+        cached = self.cache.get(key, None)
+        if cached is not None:
+            return cached
+        if len(key[0]) < len(rows):
+            # The same placement twice conflicts with itself.
+            result = Completions(0, 0, True)
+        else:
+            result = self._search(rows, max_solutions, budget)
+        enough = max_solutions is not None and result.num_solutions >= max_solutions
+        if result.complete or enough:
+            self.cache[key] = result
+        return result
+
+    def _search(
+        self, rows: Sequence[int], max_solutions: int | None, budget: _Budget
+    ) -> Completions:
+        search = SubtreeSearch(self.root, WorkUnit(rows))
+        try:
+            while not budget.exhausted:
+                num_nodes = search.num_nodes
+                finished = search.run(budget.next_slice())
+                budget.spend(search.num_nodes - num_nodes)
+                if finished:
+                    return Completions(search.num_solutions, search.num_nodes, True)
+                if max_solutions is not None and search.num_solutions >= max_solutions:
+                    break
+            return Completions(search.num_solutions, search.num_nodes, False)
+        finally:
+            search.close()
+
+    def next_rows(self, rows: Sequence[int]) -> list[int]:
+        # Every completion uses one of the rows covering the constraint with fewest
+        # candidates, as in Root's search, so these are the placements worth trying.
+        num_selected = self.root.select_rows(rows)
+        try:
+            column = self.root.smallest_column()
+            if num_selected < len(rows) or column is None:
+                return []
+            return [row.row for row in self.root.column_rows(column)]
+        finally:
+            self.root.deselect_rows(rows[:num_selected])
+
+    def hints(
+        self,
+        placements: Iterable[Placement],
+        max_hints: int | None = None,
+        num_probes: int | None = 100,
+        rng: Random | None = None,
+    ) -> list[Hint]:
+        # Ranked by the number of completions after each next placement, each
+        # counted within an even share of the query's budget (a share left unused
+        # goes to the placements after it). Counts the budget cut short are only
+        # lower bounds, so with num_probes, those are ranked by an estimate from
+        # random probes instead. Ties, such as estimates of no completions when
+        # solutions are rare, are broken by subtree size. Next placements shown to
+        # lead nowhere are left out.
+        rows = self.rows_of(placements)
+        budget = self._new_budget()
+        next_rows = self.next_rows(rows)
+        hints = []
+        for i, row in enumerate(next_rows):
+            share = budget.share(len(next_rows) - i)
+            nodes_before = share.nodes_left
+            completions = self._completions([*rows, row], None, share)
+            if nodes_before is not None and share.nodes_left is not None:
+                budget.spend(nodes_before - share.nodes_left)
+            if completions.extendable is False:
+                continue
+            estimate = None
+            if not completions.complete and num_probes is not None:
+                estimate = self._estimate([*rows, row], num_probes, rng)
+            hints.append(Hint(row, self.root.items[row], completions, estimate))
+        hints.sort(key=lambda hint: (-hint.score, -hint.subtree_size))
+        return hints[:max_hints]
+
+    def _estimate(
+        self, rows: Sequence[int], num_probes: int, rng: Random | None
+    ) -> dlinks.SearchTreeEstimate:
+        num_selected = self.root.select_rows(rows)
+        try:
+            if num_selected < len(rows):
+                return dlinks.SearchTreeEstimate()
+            return self.root.estimate_search_tree(num_probes, rng)
+        finally:
+            self.root.deselect_rows(rows[:num_selected])
+
+
+class HintEngineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root = spec.ProblemSpec.parse("5x8", ["L"]).build_problem()
+        self.engine = HintEngine(self.root)
+        self.solution = list(self.root.solve(1)[0])
+        self.constraint_sizes = self._constraint_sizes()
+
+    def _constraint_sizes(self) -> list[int]:
+        return [c.size for c in self.root.constraints.values()]
+
+    def test_completions_of_solution_prefixes(self) -> None:
+        self.assertEqual(self.engine.completions([]).num_solutions, 436)
+        for i in range(len(self.solution) + 1):
+            self.assertTrue(self.engine.is_extendable(self.solution[:i]))
+        self.assertEqual(self.engine.completions(self.solution).num_solutions, 1)
+        self.assertEqual(self._constraint_sizes(), self.constraint_sizes)
+
+    def test_conflicting_placements(self) -> None:
+        first = self.solution[0]
+        overlapping = next(
+            item
+            for item in self.root.items
+            if item != first and set(item.squares) & set(first.squares)
+        )
+        self.assertIs(self.engine.is_extendable([first, overlapping]), False)
+        self.assertIs(self.engine.is_extendable([first, first]), False)
+        self.assertEqual(self._constraint_sizes(), self.constraint_sizes)
+
+    def test_cells_as_placements(self) -> None:
+        cells = [spec.shape_cells(item) for item in self.solution[:3]]
+        self.assertEqual(
+            self.engine.rows_of(cells), self.engine.rows_of(self.solution[:3])
+        )
+        with self.assertRaises(ValueError):
+            self.engine.rows_of([[(0, 0), (9, 9), (9, 8), (9, 7)]])
+
+    def test_budget(self) -> None:
+        engine = HintEngine(self.root, max_nodes=10)
+        completions = engine.completions([])
+        self.assertFalse(completions.complete)
+        self.assertLessEqual(completions.num_nodes, 10)
+        self.assertEqual(self._constraint_sizes(), self.constraint_sizes)
+        self.assertEqual(self.root.solve().size, 436)
+
+    def test_hints(self) -> None:
+        hints = self.engine.hints(self.solution[:2])
+        expected = self.engine.completions(self.solution[:2]).num_solutions
+        self.assertEqual(sum(hint.score for hint in hints), expected)
+        self.assertEqual(
+            [hint.score for hint in hints],
+            sorted((hint.score for hint in hints), reverse=True),
+        )
+        self.assertTrue(all(hint.score > 0 and hint.complete for hint in hints))
+        self.assertEqual(len(self.engine.hints(self.solution[:2], 2)), 2)
+        self.assertEqual(self._constraint_sizes(), self.constraint_sizes)
+
+    def test_hints_share_the_budget(self) -> None:
+        # Every next placement here has completions, and each gets its share of
+        # the budget to find some.
+        engine = HintEngine(self.root, max_nodes=600)
+        lower_bounds = engine.hints([], num_probes=None)
+        self.assertGreater(len(lower_bounds), 1)
+        self.assertTrue(all(hint.num_completions > 0 for hint in lower_bounds))
+        self.assertFalse(any(hint.complete for hint in lower_bounds))
+        self.assertLessEqual(sum(hint.num_nodes for hint in lower_bounds), 600)
+        estimated = engine.hints([], num_probes=20, rng=Random(0))
+        self.assertTrue(all(hint.estimate is not None for hint in estimated))
+        self.assertEqual(self._constraint_sizes(), self.constraint_sizes)
+
+    def test_memoized_by_set_of_placements(self) -> None:
+        self.engine.completions(self.solution[:3])
+        num_cached = len(self.engine.cache)
+        self.engine.completions(list(reversed(self.solution[:3])))
+        self.assertEqual(len(self.engine.cache), num_cached)
+
+
+if __name__ == "__main__":
+    unittest.main()
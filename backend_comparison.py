@@ -0,0 +1,38 @@
+from collections.abc import Sequence
+from functools import partial
+
+import problem_spec as spec
+from time_solving import compare_backends
+
+ALL_BACKENDS = list(spec.BACKENDS)
+
+# The problems/ instances, followed by larger generated boards.
+COMPARISONS: list[tuple[str, str, list[str], int | None, Sequence[str]]] = [
+    ("l_tetrominos_in_4x4_board", "4x4", ["L"], None, ALL_BACKENDS),
+    ("o_tetrominos_in_4x2x2_box", "4x2x2", ["O"], None, ALL_BACKENDS),
+    ("t_puzzle (first solution)", "6x6x6", ["T"], 1, ALL_BACKENDS),
+    ("L tetrominos in 5x8 board", "5x8", ["L"], None, ALL_BACKENDS),
+    ("L and T tetrominos in 4x6 board", "4x6", ["L", "T"], None, ALL_BACKENDS),
+    ("O tetrominos in 2x2x12 box", "2x2x12", ["O"], None, ALL_BACKENDS),
+    ("L trominos in 3x3x3 box (first 1000)", "3x3x3", ["L3"], 1000, ALL_BACKENDS),
+    # Always filling the lowest empty cell, the bitset engine wanders into huge
+    # dead subtrees here, taking minutes where the others take seconds.
+    ("t_puzzle (first 100 solutions)", "6x6x6", ["T"], 100, ["links", "cells"]),
+]
+
+
+def main(num_iterations: int = 3) -> None:
+    for label, board, pieces, max_num_solutions, backends in COMPARISONS:
+        problem = spec.ProblemSpec.parse(board, pieces)
+        placements = problem.generate_placements()
+        compare_backends(
+            label,
+            partial(problem.build_problem, placements),
+            backends,
+            num_iterations,
+            max_num_solutions,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import problem_spec as spec
+import tracing
+
+PlacementLibrary = dict[spec.ProblemSpec, list[spec.Shape]]
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class BatchJob:
+    def __init__(
+        self,
+        job_id: str,
+        problem: spec.ProblemSpec,
+        max_solutions: int | None = None,
+        time_limit: float | None = None,
+        retries: int = 0,
+        store_solutions: bool = False,
+        backend: str = "links",
+    ) -> None:
+        self.job_id = job_id
+        self.problem = problem
+        self.max_solutions = max_solutions
+        self.time_limit = time_limit
+        self.retries = retries
+        self.store_solutions = store_solutions
+        self.backend = backend
+
+    def __str__(self) -> str:
+        return f"BatchJob({self.job_id}, {self.problem})"
+
+    @classmethod
+    def from_json(
+        cls, data: dict[str, Any], defaults: dict[str, Any] | None = None, index: int = 0
+    ) -> BatchJob:
+        options = {**(defaults or {}), **data}
+        backend = options.get("backend", "links")
+        if backend not in spec.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend!r}")
+        return cls(
+            job_id=str(options.get("id", index)),
+            problem=spec.ProblemSpec.from_json(options),
+            max_solutions=options.get("max_solutions"),
+            time_limit=options.get("time_limit"),
+            retries=options.get("retries", 0),
+            store_solutions=options.get("store_solutions", False),
+            backend=backend,
+        )
+
+
+# A job which could not be parsed from the manifest, reported instead of run.
+class InvalidJob:
+    def __init__(self, job_id: str, error: str) -> None:
+        self.job_id = job_id
+        self.error = error
+
+    def __str__(self) -> str:
+        return f"InvalidJob({self.job_id}, {self.error})"
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "status": "error",
+            "error": self.error,
+            "attempts": 0,
+        }
+
+
+class BatchSummary:
+    def __init__(self) -> None:
+        self.num_jobs = 0
+        self.num_succeeded = 0
+        self.num_failed = 0
+        self.num_attempts = 0
+        self.elapsed_time = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Ran {self.num_jobs} jobs ({self.num_succeeded} succeeded, "
+            f"{self.num_failed} failed, {self.num_attempts} attempts) "
+            f"in {self.elapsed_time:.4f}s: {self.problems_per_hour:.1f} problems/hour"
+        )
+
+    @property
+    def problems_per_hour(self) -> float:
+        if self.elapsed_time == 0:
+            return 0.0
+        return 3600 * self.num_succeeded / self.elapsed_time
+
+
+def load_manifest(path: str | Path) -> list[BatchJob | InvalidJob]:
+    # Either a JSON document (a list of jobs, or {"defaults": ..., "jobs": [...]}),
+    # or a JSON Lines file with one job per line. Each job is parsed on its own, so
+    # that one bad job is reported without holding up the rest; a manifest whose
+    # layout is wrong raises ValueError.
+    text = Path(path).read_text()
+    try:
+        document = json.loads(text)
+    except json.JSONDecodeError:
+        document = [line for line in text.splitlines() if line.strip()]
+    defaults: dict[str, Any] = {}
+    if isinstance(document, dict):
+        defaults = document.get("defaults", {})
+        if not isinstance(defaults, dict):
+            raise ValueError('"defaults" must be an object')
+        if "jobs" not in document:
+            raise ValueError('An object manifest needs a "jobs" list')
+        document = document["jobs"]
+    if not isinstance(document, list):
+        raise ValueError("The jobs must be a list")
+    return [_parse_job(job, defaults, i) for i, job in enumerate(document)]
+
+
+def _parse_job(job: Any, defaults: dict[str, Any], index: int) -> BatchJob | InvalidJob:
+    try:
+        if isinstance(job, str):
+            job = json.loads(job)
+        return BatchJob.from_json(job, defaults, index)
+    except (KeyError, TypeError, ValueError) as e:
+        job_id = job.get("id", index) if isinstance(job, dict) else index
+        return InvalidJob(str(job_id), f"{type(e).__name__}: {e}")
+
+
+@contextmanager
+def _time_limit(seconds: float | None) -> Iterator[None]:
+    if seconds is None or not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def on_alarm(signum: int, frame: Any) -> None:
+        raise JobTimeout(f"Exceeded time limit of {seconds}s")
+
+    previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+# Placements are computed once per distinct problem and shared read-only by every
+# job in a worker; only the (mutable) dancing links matrix is rebuilt per job.
+_placement_library: PlacementLibrary = {}
+
+
+def _initialise_worker(library: PlacementLibrary) -> None:
+    global _placement_library
+    _placement_library = library
+
+
+def _generate_placements(problem: spec.ProblemSpec) -> list[spec.Shape]:
+    return problem.generate_placements()
+
+
+def _run_job(job: BatchJob) -> dict[str, Any]:
+    start_time = perf_counter()
+    record: dict[str, Any] = {"id": job.job_id}
+    try:
+        with _time_limit(job.time_limit), tracing.span("batch_job", id=job.job_id):
+            placements = _placement_library.get(job.problem)
+            problem = job.problem.build_problem(placements, job.backend)
+            with tracing.span("solve", backend=job.backend):
+                solutions = problem.solve(job.max_solutions)
+    except JobTimeout as e:
+        record.update(status="timeout", error=str(e))
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    else:
+        record.update(status="ok", num_solutions=solutions.size)
+        if job.store_solutions:
+            record["solutions"] = [
+                [spec.shape_cells(piece) for piece in solution]
+                for solution in solutions
+            ]
+    record["elapsed_time"] = perf_counter() - start_time
+    return record
+
+
+def build_placement_library(
+    problems: Iterable[spec.ProblemSpec], executor: ProcessPoolExecutor
+) -> PlacementLibrary:
+    distinct_problems = list(dict.fromkeys(problems))
+    placements = executor.map(
+        partial(tracing.traced_call, _generate_placements), distinct_problems
+    )
+    return dict(zip(distinct_problems, map(tracing.merge, placements)))
+
+
+def _succeeded(future: Future[Any]) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+def run_batch(
+    all_jobs: Iterable[BatchJob | InvalidJob],
+    output_path: str | Path,
+    num_workers: int | None = None,
+) -> BatchSummary:
+    all_jobs = list(all_jobs)
+    jobs = [job for job in all_jobs if isinstance(job, BatchJob)]
+    invalid_jobs = [job for job in all_jobs if isinstance(job, InvalidJob)]
+    summary = BatchSummary()
+    summary.num_jobs = len(all_jobs)
+    summary.num_failed = len(invalid_jobs)
+    num_workers = num_workers or os.cpu_count() or 1
+    start_time = perf_counter()
+
+    with ProcessPoolExecutor(num_workers) as executor:
+        library = build_placement_library((job.problem for job in jobs), executor)
+
+    # Jobs are referred to by index, as ids need not be unique.
+    attempts = [0] * len(jobs)
+    pending = list(reversed(range(len(jobs))))
+    running: dict[Future[tuple[dict[str, Any], list[tracing.Event]]], int] = {}
+    # Jobs in flight when a worker died, which are run alone until one of them is
+    # caught crashing the pool.
+    suspects: set[int] = set()
+
+    with open(output_path, "w") as output:
+        for invalid_job in invalid_jobs:
+            output.write(json.dumps(invalid_job.to_record()) + "\n")
+        output.flush()
+
+        def finish(i: int, record: dict[str, Any]) -> None:
+            record["attempts"] = attempts[i]
+            if record["status"] == "ok":
+                summary.num_succeeded += 1
+            elif attempts[i] <= jobs[i].retries:
+                pending.append(i)
+                return
+            else:
+                summary.num_failed += 1
+            suspects.discard(i)
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+        while pending or running:
+            executor = ProcessPoolExecutor(
+                num_workers, initializer=_initialise_worker, initargs=(library,)
+            )
+            try:
+                while pending or running:
+                    # Keep the queue short so that retries go out promptly.
+                    while pending and len(running) < 2 * num_workers:
+                        isolate = pending[-1] in suspects or any(
+                            i in suspects for i in running.values()
+                        )
+                        if running and isolate:
+                            break
+                        i = pending.pop()
+                        attempts[i] += 1
+                        future = executor.submit(tracing.traced_call, _run_job, jobs[i])
+                        running[future] = i
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    # Finish the successful jobs before a broken pool raises.
+                    for future in sorted(done, key=lambda f: not _succeeded(f)):
+                        record = tracing.merge(future.result())
+                        finish(running.pop(future), record)
+            except BrokenProcessPool:
+                # A worker died. Jobs which finished before it keep their results. If
+                # one job was unfinished, it crashed the pool, and the attempt counts;
+                # otherwise the unfinished jobs are queued again as suspects, without
+                # using up an attempt.
+                unfinished = []
+                for future, i in running.items():
+                    if _succeeded(future):
+                        finish(i, tracing.merge(future.result()))
+                    else:
+                        unfinished.append(i)
+                running.clear()
+                if len(unfinished) == 1:
+                    (i,) = unfinished
+                    suspects.add(i)
+                    finish(i, {"id": jobs[i].job_id, "status": "crashed"})
+                else:
+                    for i in reversed(unfinished):
+                        attempts[i] -= 1
+                        suspects.add(i)
+                        pending.append(i)
+            finally:
+                executor.shutdown(cancel_futures=True)
+
+    summary.num_attempts = sum(attempts)
+    summary.elapsed_time = perf_counter() - start_time
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Solve a manifest of tiling problems.")
+    parser.add_argument("manifest", help="JSON or JSON Lines file of jobs")
+    parser.add_argument("output", help="JSON Lines file to stream results to")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        jobs = load_manifest(args.manifest)
+    except ValueError as e:
+        raise SystemExit(f"Invalid manifest: {e}")
+    summary = run_batch(jobs, args.output, args.workers)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
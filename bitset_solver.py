@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+from typing import Any, Generic, TypeVar, cast
+
+from dancing_links_root import Solution, Solutions
+
+
+C = TypeVar("C")
+T = TypeVar("T")
+
+
+# An exact cover engine for problems small enough that each item's constraints fit
+# in one Python integer, with the same interface as Root. The covered constraints
+# are a bitmask too, so checking for conflicts and choosing an item are each a
+# single & and |, and backtracking has nothing to undo.
+#
+# Instead of the smallest column, the search always covers the lowest uncovered
+# constraint. Every constraint below it is already covered, so the only items which
+# can cover it are those whose lowest constraint it is; they are grouped by lowest
+# constraint in advance.
+class BitsetRoot(Generic[C, T]):
+    def __init__(self) -> None:
+        self.constraints: dict[C, int] = {}
+        self.items: list[T] = []
+        self.item_constraints: list[list[int]] = []
+
+    def __str__(self) -> str:
+        return (
+            "Constraints(\n  "
+            + "\n  ".join(str(constraint) for constraint in self.constraints)
+            + "\n)\n"
+            + f"Items: {self.items}"
+        )
+
+    def add_constraint(self, constraint: C) -> None:
+        self.constraints[constraint] = len(self.constraints)
+
+    def add_item(self, data: T, constraints: Sequence[C]) -> None:
+        if len(constraints) == 0:
+            return
+        for constraint in constraints:
+            # Ensure constraint has been defined
+            if constraint not in self.constraints:
+                self.add_constraint(constraint)
+        self.item_constraints.append([self.constraints[c] for c in constraints])
+        self.items.append(data)
+
+    def solve(self, max_num_solutions=None) -> Solutions[T]:
+        return Solutions(self.generate_solutions(max_num_solutions), self.items)
+
+    def generate_solutions(
+        self, max_num_solutions: int | None = None
+    ) -> Iterator[Solution[T]]:
+        (candidates, full) = self._prepare()
+        search = self._search(candidates, full, 0, [])
+        for partial_solution in islice(search, max_num_solutions):
+            yield Solution(partial_solution, self.items)
+
+    def _prepare(self) -> tuple[list[list[tuple[int, int]]], int]:
+        # Number constraints in their natural order where there is one (e.g. cell
+        # coordinates), so that the lowest uncovered constraint fills the board in
+        # order and leaves few holes behind.
+        try:
+            ordered_constraints = sorted(cast(Iterable[Any], self.constraints))
+        except TypeError:
+            ordered_constraints = list(self.constraints)
+        constraint_bits = [0] * len(self.constraints)
+        for bit, constraint in enumerate(ordered_constraints):
+            constraint_bits[self.constraints[constraint]] = bit
+        candidates: list[list[tuple[int, int]]] = [[] for _ in self.constraints]
+        for row, constraints in enumerate(self.item_constraints):
+            mask = 0
+            for c in constraints:
+                mask |= 1 << constraint_bits[c]
+            lowest_bit = (mask & -mask).bit_length() - 1
+            candidates[lowest_bit].append((mask, row))
+        return (candidates, (1 << len(self.constraints)) - 1)
+
+    def _search(
+        self,
+        candidates: list[list[tuple[int, int]]],
+        full: int,
+        covered: int,
+        partial_solution: list[int],
+    ) -> Iterator[list[int]]:
+        if covered == full:
+            yield partial_solution
+            return
+        lowest_uncovered = (~covered & (covered + 1)).bit_length() - 1
+        for mask, row in candidates[lowest_uncovered]:
+            if not mask & covered:
+                yield from self._search(
+                    candidates, full, covered | mask, partial_solution + [row]
+                )
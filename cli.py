@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import TYPE_CHECKING, Any, cast
+
+# Only the standard library is imported up front. Everything else is imported by
+# the subcommand that needs it, so that headless solves start quickly, and NumPy
+# and matplotlib are only loaded for exporting and rendering.
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    import dancing_links_root as dlinks
+    import problem_spec as spec
+
+# Kept in step with problem_spec.BACKENDS, which is not imported up front.
+BACKEND_NAMES = ["links", "cells", "bits"]
+
+IMPORT_BENCHMARK_MODULES = [
+    "cli",
+    "problem_spec",
+    "solution_storage",
+    "polycube_drawing",
+]
+
+
+def _parse_spec(text: str) -> Any:
+    # Boards and pieces are either named, or given as JSON lists of cells.
+    return json.loads(text) if text.lstrip().startswith("[") else text
+
+
+def _problem_spec(args: argparse.Namespace) -> spec.ProblemSpec:
+    import problem_spec as spec
+
+    return spec.ProblemSpec.parse(
+        _parse_spec(args.board), [_parse_spec(piece) for piece in args.pieces]
+    )
+
+
+def solve(args: argparse.Namespace) -> None:
+    problem_spec = _problem_spec(args)
+    if args.layers and problem_spec.dimension != 3:
+        raise SystemExit("Only polycube tilings can be printed layer by layer.")
+    problem = problem_spec.build_problem(backend=args.backend)
+    solutions = problem.solve(args.max_solutions)
+    if args.output is not None:
+        import solution_storage
+
+        if args.output.endswith(".npy"):
+            solution_storage.save_rows(args.output, solutions)
+        else:
+            solution_storage.save_solutions(args.output, solutions)
+    if args.layers:
+        import polycube_voxels
+
+        for i, solution in enumerate(solutions):
+            print(f"Solution {i}")
+            volume = polycube_voxels.label_volume(solution)
+            print(polycube_voxels.layers_text(volume), end="")
+    if args.quiet or args.layers:
+        print(f"Found {solutions.size} solutions.")
+    else:
+        solutions.print()
+
+
+def count(args: argparse.Namespace) -> None:
+    from itertools import islice
+
+    problem_spec = _problem_spec(args)
+    if args.profile:
+        import problem_spec as spec
+        import profile_counting
+
+        if not isinstance(_parse_spec(args.board), str):
+            raise SystemExit("Only boxes can be counted by profile.")
+        if (
+            args.unique
+            or args.max_solutions is not None
+            or args.backend != "links"
+            or args.frontier_depth is not None
+            or args.frontier_states is not None
+        ):
+            raise SystemExit(
+                "Counting by profile cannot use --unique, -n, --backend or "
+                "--frontier-depth/--frontier-states."
+            )
+        num_solutions = profile_counting.count_tilings(
+            spec.parse_dimensions(args.board), problem_spec.pieces, None, args.workers
+        )
+        print(f"Found {num_solutions} solutions.")
+        return
+    uses_frontier = (
+        args.workers is not None
+        or args.frontier_depth is not None
+        or args.frontier_states is not None
+    )
+    if uses_frontier and args.backend != "links":
+        raise SystemExit("Frontier expansion only searches with dancing links.")
+    if args.workers is not None:
+        import frontier_expansion
+
+        if args.unique or args.max_solutions is not None:
+            raise SystemExit("Counting across processes cannot use --unique or -n.")
+
+        num_solutions = frontier_expansion.count_solutions_in_parallel(
+            problem_spec, args.frontier_depth, args.frontier_states, args.workers
+        )
+        print(f"Found {num_solutions} solutions.")
+        return
+    solutions: Iterator[dlinks.Solution]
+    if uses_frontier:
+        import frontier_expansion
+
+        problem = problem_spec.build_problem()
+        solutions = islice(
+            frontier_expansion.generate_solutions(
+                problem, args.frontier_depth, args.frontier_states
+            ),
+            args.max_solutions,
+        )
+    else:
+        problem = problem_spec.build_problem(backend=args.backend)
+        solutions = problem.generate_solutions(args.max_solutions)
+    if args.unique:
+        import problem_spec as spec
+        import solution_symmetry
+
+        deduplicator: solution_symmetry.SymmetryDeduplicator = (
+            solution_symmetry.SymmetryDeduplicator(
+                problem_spec.board, placements=map(spec.shape_cells, problem.items)
+            )
+        )
+        num_unique = sum(1 for _ in deduplicator.unique(solutions))
+        print(
+            f"Found {num_unique} solutions up to symmetry "
+            f"({deduplicator.num_seen} in total)."
+        )
+    else:
+        print(f"Found {sum(1 for _ in solutions)} solutions.")
+
+
+def estimate(args: argparse.Namespace) -> None:
+    from random import Random
+
+    problem = _problem_spec(args).build_problem()
+    print(problem.estimate_search_tree(args.probes, Random(args.seed)))
+
+
+def hint(args: argparse.Namespace) -> None:
+    import assembly_hints
+    import problem_spec as spec
+
+    engine = assembly_hints.HintEngine(
+        _problem_spec(args).build_problem(), args.max_nodes, args.time_limit
+    )
+    try:
+        placed = json.loads(args.placed)
+        extendable = engine.is_extendable(placed)
+    except (TypeError, ValueError) as e:
+        # Not a list of placements, each a list of cells of this problem.
+        raise SystemExit(f"Invalid placed pieces: {e}")
+    if extendable is None:
+        print("No completion of the placed pieces was found within the budget.")
+    else:
+        print(f"The placed pieces can{'' if extendable else 'not'} be completed.")
+    hints = engine.hints(placed, args.max_hints, args.probes)
+    for i, next_hint in enumerate(hints):
+        if next_hint.complete:
+            score = f"{next_hint.num_completions} completions"
+        else:
+            score = f"at least {next_hint.num_completions} completions"
+        if next_hint.estimate is not None:
+            score += (
+                f", estimated {next_hint.estimate.num_solutions:.4g} in a subtree of "
+                f"{next_hint.estimate.num_nodes:.4g} nodes"
+            )
+        cells = spec.shape_cells(cast(spec.Shape, next_hint.item))
+        print(f"Hint {i}: {json.dumps(cells)} ({score})")
+
+
+def benchmark(args: argparse.Namespace) -> None:
+    from functools import partial
+
+    import time_solving
+
+    problem_spec = _problem_spec(args)
+    placements = problem_spec.generate_placements()
+    time_solving.compare_backends(
+        f"{args.board} with {', '.join(args.pieces)}",
+        partial(problem_spec.build_problem, placements),
+        args.backends,
+        args.iterations,
+        args.max_solutions,
+    )
+    time_solving.time_imports(IMPORT_BENCHMARK_MODULES, args.iterations)
+
+
+def render(args: argparse.Namespace) -> None:
+    import polycube_rendering
+
+    problem_spec = _problem_spec(args)
+    if problem_spec.dimension != 3:
+        raise SystemExit("Only polycube tilings can be rendered.")
+    solutions = problem_spec.build_problem().solve(args.max_solutions)
+    num_rendered = 0
+    for _ in polycube_rendering.render_tilings(
+        solutions, args.output_directory, args.formats, args.workers
+    ):
+        num_rendered += 1
+    print(f"Rendered {num_rendered} tilings to {args.output_directory}.")
+
+
+def batch(args: argparse.Namespace) -> None:
+    import batch_solving
+
+    try:
+        jobs = batch_solving.load_manifest(args.manifest)
+    except ValueError as e:
+        raise SystemExit(f"Invalid manifest: {e}")
+    print(batch_solving.run_batch(jobs, args.output, args.workers))
+
+
+def _add_problem_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "board", help='board dimensions such as "6x6x6", or a JSON list of cells'
+    )
+    parser.add_argument(
+        "pieces", nargs="+", help="piece names such as T, or JSON lists of cells"
+    )
+
+
+def _add_max_solutions_argument(
+    parser: argparse.ArgumentParser, max_solutions: int | None
+) -> None:
+    parser.add_argument(
+        "-n",
+        "--max-solutions",
+        type=int,
+        default=max_solutions,
+        help=f"stop after this many solutions (default: {max_solutions or 'all'})",
+    )
+
+
+def _add_backend_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "-b",
+        "--backend",
+        default="links",
+        choices=BACKEND_NAMES,
+        help="exact cover engine: dancing links, dancing cells or bitsets "
+        "(default: links)",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Solve polyomino and polycube tiling problems."
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="write a Chrome trace of where the time went, and print a summary",
+    )
+    subparsers = parser.add_subparsers(required=True)
+
+    solve_parser = subparsers.add_parser("solve", help="find and print solutions")
+    _add_problem_arguments(solve_parser)
+    _add_max_solutions_argument(solve_parser, 1)
+    solve_parser.add_argument(
+        "-o", "--output", help="save solutions to a directory, or only rows to .npy"
+    )
+    solve_parser.add_argument(
+        "--layers", action="store_true", help="print polycube tilings layer by layer"
+    )
+    solve_parser.add_argument("-q", "--quiet", action="store_true")
+    _add_backend_argument(solve_parser)
+    solve_parser.set_defaults(command=solve)
+
+    count_parser = subparsers.add_parser("count", help="count solutions")
+    _add_problem_arguments(count_parser)
+    _add_max_solutions_argument(count_parser, None)
+    count_parser.add_argument(
+        "--unique", action="store_true", help="count solutions up to symmetry"
+    )
+    _add_backend_argument(count_parser)
+    count_parser.add_argument(
+        "--frontier-depth",
+        type=int,
+        default=None,
+        help="expand the search tree breadth first with NumPy to this depth",
+    )
+    count_parser.add_argument(
+        "--frontier-states",
+        type=int,
+        default=None,
+        help="expand the search tree breadth first until it is this wide",
+    )
+    count_parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="search the frontier's subtrees, or with --profile compute transfers, "
+        "across this many processes",
+    )
+    count_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="count tilings of a long box slice by slice, without searching",
+    )
+    count_parser.set_defaults(command=count)
+
+    estimate_parser = subparsers.add_parser(
+        "estimate", help="estimate the search tree size"
+    )
+    _add_problem_arguments(estimate_parser)
+    estimate_parser.add_argument("-p", "--probes", type=int, default=1000)
+    estimate_parser.add_argument("-s", "--seed", type=int, default=None)
+    estimate_parser.set_defaults(command=estimate)
+
+    hint_parser = subparsers.add_parser(
+        "hint", help="check placed pieces can be completed, and suggest the next"
+    )
+    _add_problem_arguments(hint_parser)
+    hint_parser.add_argument(
+        "-p", "--placed", default="[]", help="JSON list of placed pieces' cells"
+    )
+    hint_parser.add_argument("-k", "--max-hints", type=int, default=5)
+    hint_parser.add_argument("--max-nodes", type=int, default=100_000)
+    hint_parser.add_argument("--time-limit", type=float, default=None)
+    hint_parser.add_argument(
+        "--probes",
+        type=int,
+        default=100,
+        help="estimate completions with this many probes where counts are cut short",
+    )
+    hint_parser.set_defaults(command=hint)
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="time solving and module imports"
+    )
+    _add_problem_arguments(benchmark_parser)
+    _add_max_solutions_argument(benchmark_parser, None)
+    benchmark_parser.add_argument("-i", "--iterations", type=int, default=5)
+    benchmark_parser.add_argument(
+        "-b",
+        "--backends",
+        nargs="+",
+        default=BACKEND_NAMES,
+        choices=BACKEND_NAMES,
+        help="exact cover engines to compare (default: all)",
+    )
+    benchmark_parser.set_defaults(command=benchmark)
+
+    render_parser = subparsers.add_parser("render", help="render polycube tilings")
+    _add_problem_arguments(render_parser)
+    _add_max_solutions_argument(render_parser, 1)
+    render_parser.add_argument("-o", "--output-directory", default="renders")
+    render_parser.add_argument(
+        "-f", "--formats", nargs="+", default=["png"], choices=["png", "svg", "txt"]
+    )
+    render_parser.add_argument("-j", "--workers", type=int, default=None)
+    render_parser.set_defaults(command=render)
+
+    batch_parser = subparsers.add_parser("batch", help="solve a manifest of problems")
+    batch_parser.add_argument("manifest", help="JSON or JSON Lines file of jobs")
+    batch_parser.add_argument("output", help="JSON Lines file to stream results to")
+    batch_parser.add_argument("-j", "--workers", type=int, default=None)
+    batch_parser.set_defaults(command=batch)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.trace is None:
+        args.command(args)
+        return
+    import tracing
+
+    tracing.enable()
+    with tracing.span(f"cli.{args.command.__name__}"):
+        args.command(args)
+    tracing.export_chrome_trace(args.trace)
+    print(tracing.summary_table(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import unittest
+from collections.abc import Generator, Iterator, Sequence
+from itertools import islice
+from typing import Generic, TypeVar
+
+from dancing_links_root import Solution, Solutions
+
+
+C = TypeVar("C")
+T = TypeVar("T")
+
+
+# Knuth's "dancing cells": instead of doubly linked lists, each constraint keeps a
+# sparse set of the options still able to cover it. Removing an option from a set
+# swaps it past the end of the active part and shrinks the set's size; since the
+# swapped-out options stay where they are, undoing a removal only has to grow the
+# size again. Every change is recorded on a trail, and backtracking pops the trail.
+class DancingCellsRoot(Generic[C, T]):
+    def __init__(self) -> None:
+        self.constraints: dict[C, int] = {}
+        self.items: list[T] = []
+        # Each node is one (option, constraint) incidence. The nodes of option o are
+        # option_starts[o] to option_starts[o + 1].
+        self.node_constraints: list[int] = []
+        self.node_options: list[int] = []
+        self.node_positions: list[int] = []
+        self.option_starts: list[int] = [0]
+        # For each constraint, the nodes of options which could cover it, the first
+        # set_sizes[c] of which are active.
+        self.sets: list[list[int]] = []
+        self.set_sizes: list[int] = []
+        # The constraints still to be covered are the first num_active of active.
+        self.active: list[int] = []
+        self.active_positions: list[int] = []
+        self.num_active = 0
+        self.trail: list[int] = []
+
+    def __str__(self) -> str:
+        return (
+            "Constraints(\n  "
+            + "\n  ".join(
+                f"Column({constraint}, size: {self.set_sizes[c]})"
+                for constraint, c in self.constraints.items()
+            )
+            + "\n)\n"
+            + f"Items: {self.items}"
+        )
+
+    def add_constraint(self, constraint: C) -> None:
+        c = len(self.sets)
+        self.constraints[constraint] = c
+        self.sets.append([])
+        self.set_sizes.append(0)
+        self.active.append(c)
+        self.active_positions.append(self.num_active)
+        self.num_active += 1
+
+    def add_item(self, data: T, constraints: Sequence[C]) -> None:
+        if len(constraints) == 0:
+            return
+        option = len(self.items)
+        for constraint in constraints:
+            # Ensure constraint has been defined
+            if constraint not in self.constraints:
+                self.add_constraint(constraint)
+            c = self.constraints[constraint]
+            node = len(self.node_constraints)
+            self.node_constraints.append(c)
+            self.node_options.append(option)
+            self.node_positions.append(len(self.sets[c]))
+            self.sets[c].append(node)
+            self.set_sizes[c] += 1
+        self.option_starts.append(len(self.node_constraints))
+        self.items.append(data)
+
+    def solve(self, max_num_solutions=None) -> Solutions[T]:
+        return Solutions(self.generate_solutions(max_num_solutions), self.items)
+
+    def generate_solutions(
+        self, max_num_solutions: int | None = None
+    ) -> Iterator[Solution[T]]:
+        search = self._search([])
+        try:
+            for partial_solution in islice(search, max_num_solutions):
+                yield Solution(partial_solution, self.items)
+        finally:
+            # Closing the search unwinds it, restoring the sets if we stop early.
+            search.close()
+
+    def _search(
+        self, partial_solution: list[int]
+    ) -> Generator[list[int], None, None]:
+        if self.num_active == 0:
+            yield partial_solution
+            return
+
+        constraint = self._find_smallest_set()
+        size = self.set_sizes[constraint]
+        if size == 0:
+            return
+        mark = len(self.trail)
+        self._cover(constraint)
+        try:
+            # Covering other constraints never touches this constraint's set, so its
+            # first size nodes are stable throughout the loop.
+            candidates = self.sets[constraint]
+            for i in range(size):
+                option = self.node_options[candidates[i]]
+                option_mark = len(self.trail)
+                for node in range(
+                    self.option_starts[option], self.option_starts[option + 1]
+                ):
+                    other_constraint = self.node_constraints[node]
+                    if other_constraint != constraint:
+                        self._cover(other_constraint)
+                try:
+                    yield from self._search(partial_solution + [option])
+                finally:
+                    self._undo(option_mark)
+        finally:
+            self._undo(mark)
+
+    def _find_smallest_set(self) -> int:
+        # Ties go to the earliest defined constraint, as in Root, which keeps the
+        # two engines' search orders comparable.
+        set_sizes = self.set_sizes
+        active = self.active
+        best = active[0]
+        best_size = set_sizes[best]
+        for i in range(1, self.num_active):
+            c = active[i]
+            size = set_sizes[c]
+            if size < best_size or (size == best_size and c < best):
+                best = c
+                best_size = size
+        return best
+
+    def _cover(self, constraint: int) -> None:
+        active = self.active
+        active_positions = self.active_positions
+        position = active_positions[constraint]
+        last = active[self.num_active - 1]
+        active[position] = last
+        active_positions[last] = position
+        active[self.num_active - 1] = constraint
+        active_positions[constraint] = self.num_active - 1
+        self.num_active -= 1
+        self.trail.append(-1)
+
+        sets = self.sets
+        set_sizes = self.set_sizes
+        node_constraints = self.node_constraints
+        node_positions = self.node_positions
+        option_starts = self.option_starts
+        trail = self.trail
+        candidates = sets[constraint]
+        for i in range(set_sizes[constraint]):
+            option = self.node_options[candidates[i]]
+            for node in range(option_starts[option], option_starts[option + 1]):
+                c = node_constraints[node]
+                if c == constraint:
+                    continue
+                # Swap node with the last active node of c, and deactivate it.
+                size = set_sizes[c] - 1
+                nodes = sets[c]
+                position = node_positions[node]
+                last_node = nodes[size]
+                nodes[position] = last_node
+                node_positions[last_node] = position
+                nodes[size] = node
+                node_positions[node] = size
+                set_sizes[c] = size
+                trail.append(c)
+
+    def _undo(self, mark: int) -> None:
+        trail = self.trail
+        set_sizes = self.set_sizes
+        while len(trail) > mark:
+            c = trail.pop()
+            if c < 0:
+                self.num_active += 1
+            else:
+                set_sizes[c] += 1
+
+
+class DancingCellsTests(unittest.TestCase):
+    # Agreement with the other engines is tested in problem_spec.
+    def test_stopping_early_restores_sets(self) -> None:
+        import problem_spec as spec
+
+        problem = spec.ProblemSpec.parse("5x8", ["L"]).build_problem(backend="cells")
+        assert isinstance(problem, DancingCellsRoot)
+        set_sizes = list(problem.set_sizes)
+        self.assertEqual(problem.solve(3).size, 3)
+        self.assertEqual(problem.set_sizes, set_sizes)
+        self.assertEqual(problem.solve().size, 436)
+
+
+if __name__ == "__main__":
+    unittest.main()
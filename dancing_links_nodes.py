@@ -13,8 +13,8 @@ class ColumnHeader:
     def _coords(self) -> str:
         return f"Column header {self.constraint}"
 
-    def add_item(self, data):
-        obj = DataObject(column=self, data=data, up=self.up, down=self)
+    def add_item(self, data, row):
+        obj = DataObject(column=self, data=data, row=row, up=self.up, down=self)
         self.up.down = obj
         self.up = obj
         self.size += 1
@@ -48,13 +48,14 @@ class ColumnHeader:
 
 
 class DataObject:
-    def __init__(self, column, data, up=None, down=None) -> None:
+    def __init__(self, column, data, row, up=None, down=None) -> None:
         self.up = self if up is None else up
         self.down = self if down is None else down
         self.left = self
         self.right = self
         self.column = column
         self.data = data
+        self.row = row
 
     def __str__(self) -> str:
         return f"{self._coords()} |U:{self.up._coords()}|D:{self.down._coords()}|L:{self.left._coords()}|R:{self.right._coords()}|"
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from collections.abc import Iterable, Iterator, Sequence
+from array import array
+from collections.abc import Generator, Iterable, Iterator, Sequence
 from itertools import chain, cycle, islice
-from typing import Generic, TypeVar
+from random import Random
+from typing import Any, Generic, TypeVar, cast
 
 from dancing_links_nodes import ColumnHeader, DataObject
 
@@ -17,6 +19,7 @@ class Root(Generic[C, T]):
         self.right: ColumnHeader | Root[C, T] = self
         self.constraints: dict[C, ColumnHeader] = {}
         self.items: list[T] = []
+        self.row_nodes: list[DataObject] = []
 
     def __str__(self) -> str:
         column = self.right
@@ -40,6 +43,7 @@ class Root(Generic[C, T]):
     def add_item(self, data: T, constraints: Sequence[C]) -> None:
         if len(constraints) == 0:
             return
+        row = len(self.items)
         row_objects: list[DataObject] = []
         for constraint in constraints:
             # Ensure constraint has been defined
@@ -47,7 +51,7 @@ class Root(Generic[C, T]):
             if column is None:
                 self.add_constraint(constraint)
                 column = self.constraints[constraint]
-            row_objects.append(column.add_item(data))
+            row_objects.append(column.add_item(data, row))
         assert len(row_objects) > 0
         # No guarantee, nor need, for different rows to have the same order of constraints.
         for left, obj, right in zip(
@@ -57,45 +61,147 @@ class Root(Generic[C, T]):
         ):
             obj.link_horizontal(left=left, right=right)
         self.items.append(data)
+        self.row_nodes.append(row_objects[0])
 
     def solve(self, max_num_solutions=None) -> Solutions[T]:
-        solutions = self._search([], [], max_num_solutions)
-        return Solutions((Solution(s) for s in solutions))
+        return Solutions(self.generate_solutions(max_num_solutions), self.items)
 
-    def _search(
-        self,
-        partial_solution: list[T],
-        solutions: list[list[T]],
-        max_num_solutions: int | None = None,
-    ) -> list[list[T]]:
-        if max_num_solutions is not None and len(solutions) >= max_num_solutions:
-            return solutions
+    def generate_solutions(
+        self, max_num_solutions: int | None = None, prefix: Sequence[int] = ()
+    ) -> Iterator[Solution[T]]:
+        # The search can start below the root of the tree, from a prefix of rows
+        # which are chosen first. A prefix which conflicts has no solutions.
+        num_selected = self.select_rows(prefix)
+        try:
+            if num_selected < len(prefix):
+                return
+            search = self._search(list(prefix))
+            try:
+                for partial_solution in islice(search, max_num_solutions):
+                    yield Solution(partial_solution, self.items)
+            finally:
+                # Closing the search unwinds it, restoring the matrix if we stop early.
+                search.close()
+        finally:
+            self.deselect_rows(prefix[:num_selected])
 
+    def _search(
+        self, partial_solution: list[int]
+    ) -> Generator[list[int], None, None]:
         if self._is_empty():
-            solutions.append(partial_solution)
-            return solutions
+            yield partial_solution
+            return
 
         column = self._find_smallest_column()
         assert column is not None
         column.cover()
+        try:
+            row = column.down
+            while row is not column:
+                # Choose item corresponding to row
+                node = row.right
+                while node is not row:
+                    node.column.cover()
+                    node = node.right
+                try:
+                    yield from self._search(partial_solution + [row.row])
+                finally:
+                    # Unchoose item corresponding to row
+                    node = row.left
+                    while node is not row:
+                        node.column.uncover()
+                        node = node.left
+                row = row.down
+        finally:
+            column.uncover()
+
+    def estimate_search_tree(
+        self, num_probes: int, rng: Random | None = None
+    ) -> SearchTreeEstimate:
+        # Knuth's estimator: follow random paths down the search tree, weighting
+        # each node by the product of the branching factors above it.
+        rng = Random() if rng is None else rng
+        estimate = SearchTreeEstimate()
+        for _ in range(num_probes):
+            (num_nodes, num_solutions) = self._probe(rng)
+            estimate.add_probe(num_nodes, num_solutions)
+        return estimate
+
+    def _probe(self, rng: Random) -> tuple[float, float]:
+        chosen_rows: list[DataObject] = []
+        weight = 1.0
+        num_nodes = 1.0
+        try:
+            while not self._is_empty():
+                column = self._find_smallest_column()
+                if column.size == 0:
+                    return (num_nodes, 0.0)
+                weight *= column.size
+                num_nodes += weight
+                row = column.down
+                for _ in range(rng.randrange(column.size)):
+                    row = row.down
+                self._cover_row(row)
+                chosen_rows.append(row)
+            return (num_nodes, weight)
+        finally:
+            self._deselect_rows(chosen_rows)
+
+    # Searches outside Root, such as subtree_search's, choose rows with these and
+    # branch on smallest_column. Rows selected must be deselected, in one call or
+    # in reverse order, before the matrix is used for anything else.
+    def select_rows(self, rows: Sequence[int]) -> int:
+        return self._select_rows([self.row_nodes[row] for row in rows])
+
+    def deselect_rows(self, rows: Sequence[int]) -> None:
+        self._deselect_rows([self.row_nodes[row] for row in rows])
+
+    def smallest_column(self) -> ColumnHeader | None:
+        # None if every constraint is covered, i.e. the chosen rows are a solution.
+        column: ColumnHeader | None = self._find_smallest_column()
+        return column
 
+    def column_rows(self, column: ColumnHeader) -> list[DataObject]:
+        rows: list[Any] = []
         row = column.down
         while row is not column:
-            # Choose item corresponding to row
-            node = row.right
-            while node is not row:
-                node.column.cover()
-                node = node.right
-            _partial_solution = partial_solution + [row.data]
-            self._search(_partial_solution, solutions, max_num_solutions)
-            # Unchoose item corresponding to row
-            node = row.left
-            while node is not row:
-                node.column.uncover()
-                node = node.left
+            rows.append(row)
             row = row.down
-        column.uncover()
-        return solutions
+        return cast(list[DataObject], rows)
+
+    def _select_rows(self, rows: Sequence[DataObject]) -> int:
+        # Choose rows until one conflicts with those already chosen, returning how
+        # many were chosen.
+        for i, row in enumerate(rows):
+            node = row
+            while True:
+                if node.column.left.right is not node.column:
+                    return i
+                node = node.right
+                if node is row:
+                    break
+            self._cover_row(row)
+        return len(rows)
+
+    def _deselect_rows(self, rows: Sequence[DataObject]) -> None:
+        for row in reversed(rows):
+            self._uncover_row(row)
+
+    def _cover_row(self, row: DataObject) -> None:
+        node = row
+        while True:
+            node.column.cover()
+            node = node.right
+            if node is row:
+                break
+
+    def _uncover_row(self, row: DataObject) -> None:
+        node = row.left
+        while True:
+            node.column.uncover()
+            if node is row:
+                break
+            node = node.left
 
     def _is_empty(self) -> bool:
         return self.left is self and self.right is self
@@ -110,32 +216,97 @@ class Root(Generic[C, T]):
         return column
 
 
+class SearchTreeEstimate:
+    def __init__(self) -> None:
+        self.num_probes = 0
+        self.total_nodes = 0.0
+        self.total_solutions = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Estimated {self.num_nodes:.4g} search tree nodes and "
+            f"{self.num_solutions:.4g} solutions from {self.num_probes} probes."
+        )
+
+    @property
+    def num_nodes(self) -> float:
+        return self.total_nodes / self.num_probes if self.num_probes else 0.0
+
+    @property
+    def num_solutions(self) -> float:
+        return self.total_solutions / self.num_probes if self.num_probes else 0.0
+
+    def add_probe(self, num_nodes: float, num_solutions: float) -> None:
+        self.num_probes += 1
+        self.total_nodes += num_nodes
+        self.total_solutions += num_solutions
+
+
+# Solutions are stored as row indices into the problem's items, and only decoded
+# into items when asked for.
 class Solution(Generic[T]):
-    def __init__(self, solution: Iterable[T]) -> None:
-        self.solution: list[T] = list(solution)
+    def __init__(self, rows: Iterable[int], items: Sequence[T]) -> None:
+        self.rows: array[int] = array("I", rows)
+        self.items = items
 
     def __str__(self) -> str:
-        return ", ".join((str(item) for item in self.solution))
+        return ", ".join((str(item) for item in self))
 
     def __iter__(self) -> Iterator[T]:
-        return self.solution.__iter__()
+        return (self.items[row] for row in self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def solution(self) -> list[T]:
+        return list(self)
 
 
 class Solutions(Generic[T]):
-    def __init__(self, solutions: Iterable[Solution[T]]) -> None:
-        self.solutions: list[Solution[T]] = list(solutions)
+    def __init__(
+        self, solutions: Iterable[Solution[T]], items: Sequence[T] | None = None
+    ) -> None:
+        self.items: Sequence[T] = [] if items is None else items
+        # All solutions' rows are concatenated, solution i being
+        # rows[offsets[i]:offsets[i + 1]].
+        self.rows: array[int] = array("I")
+        self.offsets: array[int] = array("Q", [0])
+        for solution in solutions:
+            self.append(solution)
 
     @property
     def size(self) -> int:
-        return len(self.solutions)
+        return len(self.offsets) - 1
+
+    @property
+    def solutions(self) -> list[Solution[T]]:
+        return list(self)
+
+    def append(self, solution: Solution[T]) -> None:
+        if self.size == 0:
+            self.items = solution.items
+        self.rows.extend(solution.rows)
+        self.offsets.append(len(self.rows))
 
     def print(self) -> None:
-        print(f"Found {len(self.solutions)} solutions.")
-        for i, solution in enumerate(self.solutions):
+        print(f"Found {self.size} solutions.")
+        for i, solution in enumerate(self):
             print(f"Solution {i}: {solution}")
 
+    def __len__(self) -> int:
+        return self.size
+
     def __iter__(self) -> Iterator[Solution[T]]:
-        return self.solutions.__iter__()
+        return (self[i] for i in range(self.size))
 
     def __getitem__(self, key):
-        return self.solutions.__getitem__(key)
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(self.size))]
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError("Solution index out of range")
+        return Solution(
+            self.rows[self.offsets[key] : self.offsets[key + 1]], self.items
+        )
@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import threading
+import unittest
+from collections import deque
+from collections.abc import Callable, Sequence
+from hashlib import blake2b
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener, wait
+from queue import Empty, SimpleQueue
+from time import monotonic, perf_counter, sleep
+from typing import Any, cast
+
+import dancing_links_root as dlinks
+import problem_spec as spec
+from subtree_search import SubtreeSearch, WorkUnit
+
+# Workers search this many nodes between checks for steal requests, and send
+# statistics at most this often (in seconds), which doubles as a heartbeat.
+NODE_BUDGET = 2000
+HEARTBEAT_INTERVAL = 1.0
+POLL_INTERVAL = 0.05
+
+AUTHKEY_ENV_VAR = "TILING_AUTHKEY"
+
+
+def items_digest(root: dlinks.Root) -> str:
+    # Rows are only meaningful between machines that number the placements alike.
+    digest = blake2b(digest_size=16)
+    for item in root.items:
+        digest.update(repr(spec.shape_cells(item)).encode())
+    return digest.hexdigest()
+
+
+class DistributedResult:
+    def __init__(self) -> None:
+        self.num_solutions = 0
+        self.solutions: list[list[int]] = []
+        self.num_units = 0
+        self.num_steals = 0
+        self.num_requeued = 0
+        self.num_rejected = 0
+        # Nodes searched per worker, including in units lost with their worker.
+        self.worker_nodes: dict[str, int] = {}
+        self.elapsed_time = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Found {self.num_solutions} solutions in {self.num_units} work units "
+            f"({self.num_steals} steals, {self.num_requeued} requeued) across "
+            f"{len(self.worker_nodes)} workers, searching "
+            f"{sum(self.worker_nodes.values())} nodes in {self.elapsed_time:.2f}s."
+        )
+
+
+class _Worker:
+    def __init__(self, connection: Connection) -> None:
+        self.connection = connection
+        self.name = "?"
+        self.ready = False
+        self.unit_id: int | None = None
+        self.last_seen = monotonic()
+        self.steal_refused_at = float("-inf")
+
+
+# The coordinator hands out work units, and whenever a worker is idle with nothing
+# queued, asks a busy worker to split its unit. A unit's solutions are only counted
+# once its worker reports it done, so a unit whose worker is lost (its connection
+# drops or it goes quiet for worker_timeout seconds) is simply queued again, less
+# whatever it had already given away.
+class Coordinator:
+    def __init__(
+        self,
+        problem_spec: spec.ProblemSpec,
+        authkey: bytes,
+        address: tuple[str, int] = ("localhost", 0),
+        store_solutions: bool = False,
+        worker_timeout: float = 30.0,
+        on_progress: Callable[[DistributedResult], None] | None = None,
+    ) -> None:
+        # Messages are pickled, so only authenticated peers may connect; an empty
+        # key would turn authentication off.
+        if not authkey:
+            raise ValueError("An authkey is required")
+        self.problem_spec = problem_spec
+        self.store_solutions = store_solutions
+        self.worker_timeout = worker_timeout
+        self.on_progress = on_progress
+        self.digest = items_digest(problem_spec.build_problem())
+        self.listener = Listener(address, authkey=authkey)
+        self.new_connections: SimpleQueue[Connection] = SimpleQueue()
+        self.workers: dict[Connection, _Worker] = {}
+        self.units: dict[int, WorkUnit] = {}
+        self.queue: deque[int] = deque()
+        self.next_unit_id = 0
+        self.stealing_from: _Worker | None = None
+        self.result = DistributedResult()
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return cast(tuple[str, int], self.listener.address)
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                self.new_connections.put(self.listener.accept())
+            except AuthenticationError:
+                continue
+            except OSError:
+                # The listener was closed.
+                return
+
+    def _add_unit(self, unit: WorkUnit) -> int:
+        unit_id = self.next_unit_id
+        self.next_unit_id += 1
+        self.units[unit_id] = unit
+        return unit_id
+
+    def run(self) -> DistributedResult:
+        start_time = perf_counter()
+        threading.Thread(target=self._accept, daemon=True).start()
+        self.queue.append(self._add_unit(WorkUnit(())))
+        try:
+            while self.units:
+                self._admit_workers()
+                self._assign_units()
+                self._request_steal()
+                connections = list(self.workers)
+                if not connections:
+                    sleep(POLL_INTERVAL)
+                ready = cast(list[Connection], wait(connections, POLL_INTERVAL))
+                for connection in ready:
+                    worker = self.workers[connection]
+                    try:
+                        message: tuple[Any, ...] = connection.recv()
+                    except (EOFError, OSError):
+                        self._lose(worker)
+                        continue
+                    worker.last_seen = monotonic()
+                    self._handle(worker, message)
+                for worker in list(self.workers.values()):
+                    if (
+                        worker.unit_id is not None
+                        and monotonic() - worker.last_seen > self.worker_timeout
+                    ):
+                        self._lose(worker)
+        finally:
+            for worker in list(self.workers.values()):
+                try:
+                    worker.connection.send(("stop",))
+                except OSError:
+                    pass
+                worker.connection.close()
+            self.listener.close()
+        self.result.elapsed_time = perf_counter() - start_time
+        return self.result
+
+    def _admit_workers(self) -> None:
+        while True:
+            try:
+                connection = self.new_connections.get_nowait()
+            except Empty:
+                return
+            self.workers[connection] = _Worker(connection)
+            connection.send(("problem", self.problem_spec, self.store_solutions))
+
+    def _assign_units(self) -> None:
+        for worker in self.workers.values():
+            if not self.queue:
+                return
+            if worker.ready and worker.unit_id is None:
+                unit_id = self.queue.popleft()
+                worker.unit_id = unit_id
+                worker.last_seen = monotonic()
+                worker.connection.send(
+                    ("unit", unit_id, *self.units[unit_id].to_message())
+                )
+
+    def _request_steal(self) -> None:
+        if self.queue or self.stealing_from is not None:
+            return
+        if not any(w.ready and w.unit_id is None for w in self.workers.values()):
+            return
+        now = monotonic()
+        victims = [
+            w
+            for w in self.workers.values()
+            if w.unit_id is not None and now - w.steal_refused_at > 10 * POLL_INTERVAL
+        ]
+        if victims:
+            self.stealing_from = min(victims, key=lambda w: w.unit_id or 0)
+            self.stealing_from.connection.send(("steal",))
+
+    def _handle(self, worker: _Worker, message: tuple[Any, ...]) -> None:
+        kind = message[0]
+        if kind == "ready":
+            (_, worker.name, digest) = message
+            if digest != self.digest:
+                # The worker numbers the placements differently from us.
+                self.result.num_rejected += 1
+                worker.connection.send(("stop",))
+                self._drop(worker)
+                return
+            worker.ready = True
+            self.result.worker_nodes.setdefault(worker.name, 0)
+        elif kind == "progress":
+            self.result.worker_nodes[worker.name] += message[1]
+        elif kind == "split":
+            (_, unit_id, units) = message
+            if worker is self.stealing_from:
+                self.stealing_from = None
+            if not units:
+                worker.steal_refused_at = monotonic()
+                return
+            self.result.num_steals += 1
+            for prefix, exclusions in units:
+                self.units[unit_id].exclusions.append(prefix)
+                self.queue.append(self._add_unit(WorkUnit(prefix, exclusions)))
+        elif kind == "done":
+            (_, unit_id, num_solutions, solutions, num_nodes) = message
+            del self.units[unit_id]
+            worker.unit_id = None
+            self.result.num_units += 1
+            self.result.num_solutions += num_solutions
+            self.result.solutions.extend(solutions)
+            self.result.worker_nodes[worker.name] += num_nodes
+            if self.on_progress is not None:
+                self.on_progress(self.result)
+
+    def _lose(self, worker: _Worker) -> None:
+        if worker.unit_id is not None:
+            self.queue.appendleft(worker.unit_id)
+            self.result.num_requeued += 1
+        self._drop(worker)
+
+    def _drop(self, worker: _Worker) -> None:
+        if worker is self.stealing_from:
+            self.stealing_from = None
+        del self.workers[worker.connection]
+        worker.connection.close()
+
+
+def _search_unit(
+    connection: Connection,
+    root: dlinks.Root,
+    unit_id: int,
+    unit: WorkUnit,
+    store_solutions: bool,
+) -> bool:
+    # Returns False if told to stop part way.
+    search = SubtreeSearch(root, unit, store_solutions)
+    reported_nodes = 0
+    last_report = monotonic()
+    try:
+        while not search.run(NODE_BUDGET):
+            while connection.poll():
+                message = connection.recv()
+                if message[0] == "steal":
+                    units = [u.to_message() for u in search.split()]
+                    connection.send(("split", unit_id, units))
+                elif message[0] == "stop":
+                    return False
+            if monotonic() - last_report > HEARTBEAT_INTERVAL:
+                connection.send(("progress", search.num_nodes - reported_nodes))
+                reported_nodes = search.num_nodes
+                last_report = monotonic()
+    finally:
+        search.close()
+    connection.send(
+        (
+            "done",
+            unit_id,
+            search.num_solutions,
+            search.solutions,
+            search.num_nodes - reported_nodes,
+        )
+    )
+    return True
+
+
+def run_worker(
+    address: tuple[str, int], authkey: bytes, name: str | None = None
+) -> None:
+    if not authkey:
+        raise ValueError("An authkey is required")
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    with Client(address, authkey=authkey) as connection:
+        root = None
+        store_solutions = False
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                return
+            if message[0] == "problem":
+                (_, problem_spec, store_solutions) = message
+                root = problem_spec.build_problem()
+                connection.send(("ready", name, items_digest(root)))
+            elif message[0] == "unit":
+                assert root is not None
+                (_, unit_id, prefix, exclusions) = message
+                unit = WorkUnit(prefix, exclusions)
+                if not _search_unit(connection, root, unit_id, unit, store_solutions):
+                    return
+            elif message[0] == "steal":
+                # The unit was finished before the request arrived.
+                connection.send(("split", None, []))
+            elif message[0] == "stop":
+                return
+
+
+def parse_address(text: str) -> tuple[str, int]:
+    (host, _, port) = text.rpartition(":")
+    return (host or "localhost", int(port))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Search one tiling problem across several machines."
+    )
+    parser.add_argument(
+        "--authkey",
+        default=os.environ.get(AUTHKEY_ENV_VAR),
+        help=f"shared secret for connections (default: ${AUTHKEY_ENV_VAR})",
+    )
+    subparsers = parser.add_subparsers(dest="role", required=True)
+    coordinator_parser = subparsers.add_parser("coordinator")
+    coordinator_parser.add_argument("board")
+    coordinator_parser.add_argument("pieces", nargs="+")
+    coordinator_parser.add_argument("-a", "--address", default="0.0.0.0:6000")
+    coordinator_parser.add_argument("--worker-timeout", type=float, default=30.0)
+    worker_parser = subparsers.add_parser("worker")
+    worker_parser.add_argument("address", help="coordinator address as host:port")
+    worker_parser.add_argument("--name", default=None)
+    args = parser.parse_args()
+    if not args.authkey:
+        parser.error(f"an authkey is required, with --authkey or ${AUTHKEY_ENV_VAR}")
+    authkey = args.authkey.encode()
+
+    if args.role == "worker":
+        run_worker(parse_address(args.address), authkey, args.name)
+        return
+
+    def report(result: DistributedResult) -> None:
+        if result.num_units % 100 == 0:
+            print(f"{result.num_units} units done, {result.num_solutions} solutions")
+
+    coordinator = Coordinator(
+        spec.ProblemSpec.parse(args.board, args.pieces),
+        authkey,
+        parse_address(args.address),
+        worker_timeout=args.worker_timeout,
+        on_progress=report,
+    )
+    print(f"Listening on {coordinator.address[0]}:{coordinator.address[1]}")
+    print(coordinator.run())
+
+
+class DistributedSearchTests(unittest.TestCase):
+    AUTHKEY = b"test"
+
+    def _start_workers(self, address: tuple[str, int], n: int) -> list[Any]:
+        import multiprocessing
+
+        workers = [
+            multiprocessing.Process(
+                target=run_worker, args=(address, self.AUTHKEY, f"worker{i}")
+            )
+            for i in range(n)
+        ]
+        for worker in workers:
+            worker.start()
+        return workers
+
+    def _run_coordinator(
+        self, coordinator: Coordinator, connect_early: Sequence[Callable[[], None]]
+    ) -> DistributedResult:
+        results = []
+        thread = threading.Thread(target=lambda: results.append(coordinator.run()))
+        thread.start()
+        for connect in connect_early:
+            connect()
+        workers = self._start_workers(coordinator.address, 3)
+        thread.join(60)
+        for worker in workers:
+            worker.join(10)
+        return results[0]
+
+    def test_workers_on_localhost(self) -> None:
+        problem = spec.ProblemSpec.parse("6x8", ["L"])
+        coordinator = Coordinator(problem, authkey=self.AUTHKEY, store_solutions=True)
+        result = self._run_coordinator(coordinator, [])
+        self.assertEqual(result.num_solutions, problem.build_problem().solve().size)
+        self.assertEqual(len({tuple(sorted(s)) for s in result.solutions}), 4340)
+        self.assertGreater(result.num_steals, 0)
+
+    def test_lost_worker_is_requeued(self) -> None:
+        problem = spec.ProblemSpec.parse("5x8", ["L"])
+        coordinator = Coordinator(problem, authkey=self.AUTHKEY)
+
+        def vanish_with_root_unit() -> None:
+            # Take the first unit, the whole tree, then disconnect.
+            with Client(coordinator.address, authkey=self.AUTHKEY) as connection:
+                (_, problem_spec, _) = connection.recv()
+                root = problem_spec.build_problem()
+                connection.send(("ready", "vanishing", items_digest(root)))
+                self.assertEqual(connection.recv()[0], "unit")
+
+        result = self._run_coordinator(coordinator, [vanish_with_root_unit])
+        self.assertEqual(result.num_solutions, 436)
+        self.assertEqual(result.num_requeued, 1)
+
+    def test_authkey_is_required(self) -> None:
+        with self.assertRaises(ValueError):
+            Coordinator(spec.ProblemSpec.parse("4x4", ["L"]), b"")
+        with self.assertRaises(ValueError):
+            run_worker(("localhost", 0), b"")
+
+
+if __name__ == "__main__":
+    main()
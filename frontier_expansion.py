@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import os
+import unittest
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any
+
+import numpy as np
+
+import dancing_links_root as dlinks
+import problem_spec as spec
+import tracing
+
+# States are expanded in chunks, bounding the (states x placements) matrices.
+CHUNK_SIZE = 1024
+
+# With no limit given, the frontier handed to worker processes is expanded until
+# it has this many states per worker, rather than over the whole tree.
+STATES_PER_WORKER = 64
+
+
+def placement_matrix(root: dlinks.Root) -> np.ndarray:
+    # Row r, column j is True if item r of the root covers its j-th constraint.
+    matrix: np.ndarray = np.zeros((len(root.items), len(root.constraints)), dtype=bool)
+    columns = {column: j for j, column in enumerate(root.constraints.values())}
+    for r, first_node in enumerate(root.row_nodes):
+        node = first_node
+        while True:
+            matrix[r, columns[node.column]] = True
+            node = node.right
+            if node is first_node:
+                break
+    return matrix
+
+
+class Frontier:
+    def __init__(self, prefixes: np.ndarray, solutions: list[list[int]]) -> None:
+        # Each prefix is the rows chosen so far on a path from the root of the search
+        # tree; together their subtrees hold every solution not already found.
+        self.prefixes = prefixes
+        self.solutions = solutions
+
+    def __str__(self) -> str:
+        return (
+            f"Frontier({len(self.prefixes)} states at depth {self.depth}, "
+            f"{len(self.solutions)} solutions)"
+        )
+
+    @property
+    def depth(self) -> int:
+        return int(self.prefixes.shape[1])
+
+
+def _expand(
+    placements: np.ndarray, occupancy: np.ndarray, prefixes: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    placements_float: np.ndarray = placements.astype(np.float32)
+    new_occupancies = []
+    new_prefixes = []
+    for start in range(0, len(occupancy), CHUNK_SIZE):
+        chunk = occupancy[start : start + CHUNK_SIZE]
+        # Placements compatible with a state overlap none of its covered cells.
+        compatible = (chunk.astype(np.float32) @ placements_float.T) == 0
+        # Count the compatible placements covering each cell, and branch on the
+        # uncovered cell with fewest, as Root does with its smallest column.
+        counts = compatible.astype(np.float32) @ placements_float
+        counts[chunk] = np.inf
+        chosen_cells = counts.argmin(axis=1)
+        alive = counts[np.arange(len(chunk)), chosen_cells] > 0
+        children = compatible & placements[:, chosen_cells].T & alive[:, np.newaxis]
+        (states, rows) = np.nonzero(children)
+        new_occupancies.append(chunk[states] | placements[rows])
+        new_prefixes.append(
+            np.concatenate([prefixes[start + states], rows[:, np.newaxis]], axis=1)
+        )
+    if len(new_occupancies) == 0:
+        return (
+            np.zeros((0, occupancy.shape[1]), dtype=bool),
+            np.zeros((0, prefixes.shape[1] + 1), dtype=np.int64),
+        )
+    return (np.concatenate(new_occupancies), np.concatenate(new_prefixes))
+
+
+@tracing.traced()
+def expand_frontier(
+    root: dlinks.Root, max_depth: int | None = None, max_states: int | None = None
+) -> Frontier:
+    # Breadth first, expanding every state at one depth at once, until reaching
+    # max_depth or having at least max_states states. With neither limit, the whole
+    # tree is expanded and only solutions are left.
+    placements = placement_matrix(root)
+    occupancy: np.ndarray = np.zeros((1, placements.shape[1]), dtype=bool)
+    prefixes: np.ndarray = np.zeros((1, 0), dtype=np.int64)
+    solutions: list[list[int]] = []
+    while len(prefixes) > 0:
+        if max_depth is not None and prefixes.shape[1] >= max_depth:
+            break
+        if max_states is not None and len(prefixes) >= max_states:
+            break
+        (occupancy, prefixes) = _expand(placements, occupancy, prefixes)
+        complete = occupancy.all(axis=1)
+        solutions.extend(prefixes[complete].tolist())
+        (occupancy, prefixes) = (occupancy[~complete], prefixes[~complete])
+    return Frontier(prefixes, solutions)
+
+
+def generate_solutions(
+    root: dlinks.Root, max_depth: int | None = None, max_states: int | None = None
+) -> Iterator[dlinks.Solution]:
+    frontier = expand_frontier(root, max_depth, max_states)
+    for rows in frontier.solutions:
+        yield dlinks.Solution(rows, root.items)
+    for prefix in frontier.prefixes.tolist():
+        if not tracing.is_enabled():
+            yield from root.generate_solutions(prefix=prefix)
+            continue
+        # When tracing, each subtree is searched in full before its solutions are
+        # yielded, so that its span times only the search.
+        with tracing.span("search_subtree", depth=len(prefix)):
+            solutions = list(root.generate_solutions(prefix=prefix))
+        yield from solutions
+
+
+# Each worker process builds its own copy of the problem from the same placements,
+# so that row numbers agree with the parent's frontier.
+_worker_root: dlinks.Root | None = None
+
+
+def _initialise_worker(
+    problem_spec: spec.ProblemSpec, placements: list[spec.Shape]
+) -> None:
+    global _worker_root
+    _worker_root = problem_spec.build_problem(placements)
+
+
+def _count_subtrees(prefixes: list[list[int]]) -> int:
+    assert _worker_root is not None
+    root = _worker_root
+    num_solutions = 0
+    for prefix in prefixes:
+        with tracing.span("search_subtree", depth=len(prefix)):
+            num_solutions += sum(1 for _ in root.generate_solutions(prefix=prefix))
+    return num_solutions
+
+
+def count_solutions_in_parallel(
+    problem_spec: spec.ProblemSpec,
+    max_depth: int | None = None,
+    max_states: int | None = None,
+    num_workers: int | None = None,
+) -> int:
+    if max_depth is None and max_states is None:
+        max_states = STATES_PER_WORKER * (num_workers or os.cpu_count() or 1)
+    placements = problem_spec.generate_placements()
+    root = problem_spec.build_problem(placements)
+    frontier = expand_frontier(root, max_depth, max_states)
+    prefixes = frontier.prefixes.tolist()
+    chunks = [prefixes[i : i + 16] for i in range(0, len(prefixes), 16)]
+    with ProcessPoolExecutor(
+        num_workers, initializer=_initialise_worker, initargs=(problem_spec, placements)
+    ) as executor:
+        counts = executor.map(partial(tracing.traced_call, _count_subtrees), chunks)
+        return len(frontier.solutions) + sum(map(tracing.merge, counts))
+
+
+class FrontierExpansionTests(unittest.TestCase):
+    def _assert_matches_search(self, root: dlinks.Root, **kwargs: Any) -> None:
+        expected = sorted(sorted(s.rows) for s in root.solve())
+        actual = sorted(sorted(s.rows) for s in generate_solutions(root, **kwargs))
+        self.assertEqual(actual, expected)
+
+    def test_shallow_frontier(self) -> None:
+        root = spec.ProblemSpec.parse("5x8", ["L"]).build_problem()
+        self._assert_matches_search(root, max_depth=3)
+
+    def test_frontier_deeper_than_tree(self) -> None:
+        root = spec.ProblemSpec.parse("4x2x2", ["O"]).build_problem()
+        self._assert_matches_search(root, max_depth=10)
+        self.assertEqual(len(expand_frontier(root, 10).solutions), 11)
+
+    def test_max_states(self) -> None:
+        root = spec.ProblemSpec.parse("4x6", ["L", "T"]).build_problem()
+        frontier = expand_frontier(root, max_depth=6, max_states=20)
+        self.assertGreaterEqual(len(frontier.prefixes), 20)
+        self.assertLess(frontier.depth, 6)
+        self._assert_matches_search(root, max_depth=6, max_states=20)
+
+    def test_parallel_count(self) -> None:
+        problem = spec.ProblemSpec.parse("5x8", ["L"])
+        self.assertEqual(count_solutions_in_parallel(problem, 4, num_workers=2), 436)
+        self.assertEqual(count_solutions_in_parallel(problem, num_workers=2), 436)
+
+    def test_whole_tree(self) -> None:
+        root = spec.ProblemSpec.parse("4x6", ["L", "T"]).build_problem()
+        frontier = expand_frontier(root)
+        self.assertEqual(len(frontier.prefixes), 0)
+        self.assertEqual(len(frontier.solutions), root.solve().size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,4 @@
 import problems.t_puzzle as t_puzzle
-import polycube_drawing
 
 
 def main() -> None:
@@ -8,6 +7,9 @@ def main() -> None:
         print("No solutions found.")
         return
     solution = solutions[0]
+    # Imported here, as matplotlib is slow to import and only needed for display.
+    import polycube_drawing
+
     polycube_drawing.print_polycube_tiling_layers(solution.solution)
     polycube_drawing.draw_polycubes_tiling(solution.solution)
 
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import polycube as polyc
+import polycube_voxels
+import tracing
+
+FORMATS = ("png", "svg", "txt")
+
+# Jobs are submitted as earlier ones finish, keeping at most this many per worker
+# in flight, so that the label volumes are not all built up front.
+JOBS_IN_FLIGHT_PER_WORKER = 8
+
+
+def _initialise_worker() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+@tracing.traced()
+def render_volume(
+    volume: np.ndarray, path_stem: str | Path, formats: Sequence[str] = ("png",)
+) -> list[Path]:
+    paths = []
+    if "txt" in formats:
+        path = Path(path_stem).with_suffix(".txt")
+        path.write_text(polycube_voxels.layers_text(volume))
+        paths.append(path)
+    image_formats = [f for f in formats if f != "txt"]
+    if image_formats:
+        # Build figures directly rather than through pyplot, which keeps no global
+        # state and never needs a display.
+        from matplotlib.figure import Figure
+
+        figure = Figure()
+        ax = figure.add_subplot(projection="3d")
+        polycube_voxels.draw_voxels(ax, volume)
+        for image_format in image_formats:
+            path = Path(path_stem).with_suffix(f".{image_format}")
+            figure.savefig(path, format=image_format)
+            paths.append(path)
+    return paths
+
+
+def _render_job(job: tuple[np.ndarray, Path, Sequence[str]]) -> list[Path]:
+    return render_volume(*job)
+
+
+def render_tilings(
+    tilings: Iterable[Iterable[polyc.Polycube]],
+    output_directory: str | Path,
+    formats: Sequence[str] = ("png",),
+    num_workers: int | None = None,
+    prefix: str = "solution",
+) -> Iterator[list[Path]]:
+    unknown_formats = set(formats) - set(FORMATS)
+    if unknown_formats:
+        raise ValueError(f"Unknown formats: {', '.join(sorted(unknown_formats))}")
+    output_directory = Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    # Label volumes are built in this process: they are small to send, and leave
+    # the workers nothing to do but draw.
+    jobs = (
+        (
+            polycube_voxels.label_volume(tiling),
+            output_directory / f"{prefix}_{i:06d}",
+            formats,
+        )
+        for i, tiling in enumerate(tilings)
+    )
+    max_in_flight = JOBS_IN_FLIGHT_PER_WORKER * (num_workers or os.cpu_count() or 1)
+    in_flight: deque[Future[tuple[list[Path], list[tracing.Event]]]] = deque()
+    with ProcessPoolExecutor(num_workers, initializer=_initialise_worker) as executor:
+        for job in jobs:
+            if len(in_flight) >= max_in_flight:
+                yield tracing.merge(in_flight.popleft().result())
+            in_flight.append(executor.submit(tracing.traced_call, _render_job, job))
+        while in_flight:
+            yield tracing.merge(in_flight.popleft().result())
+
+
+def main() -> None:
+    import solution_storage
+
+    parser = argparse.ArgumentParser(description="Render stored polycube tilings.")
+    parser.add_argument("solutions", help="solutions directory from solution_storage")
+    parser.add_argument("output_directory")
+    parser.add_argument("-f", "--formats", nargs="+", default=["png"], choices=FORMATS)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+    solutions = solution_storage.load_solutions(args.solutions)
+    num_rendered = 0
+    for _ in render_tilings(
+        solutions, args.output_directory, args.formats, args.workers
+    ):
+        num_rendered += 1
+    print(f"Rendered {num_rendered} tilings to {args.output_directory}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
 import functools
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 
 import dancing_links_root as dlinks
 import polycube as polyc
+import tracing
 
 PolycubeTilingProblem = dlinks.Root[tuple[int, int, int], polyc.Polycube]
 
 
-def _define_all_piece_orientations(
+@tracing.traced()
+def define_all_piece_orientations(
     polycubes: Iterable[polyc.Polycube],
 ) -> set[polyc.Polycube]:
     res: set[polyc.Polycube] = set()
@@ -37,14 +39,18 @@ def _generate_piece_positions(
 ) -> set[polyc.Polycube]:
     positions: set[polyc.Polycube] = set()
     for piece in pieces:
-        positions.update(polyc.generate_positions(box, piece))
+        with tracing.span("generate_positions", cells=len(piece.cubes)):
+            positions.update(polyc.generate_positions(box, piece))
     return positions
 
 
-def _initialise_dancing_links(
-    box: polyc.Polycube, piece_positions: Iterable[polyc.Polycube]
+@tracing.traced()
+def initialise_dancing_links(
+    box: polyc.Polycube,
+    piece_positions: Iterable[polyc.Polycube],
+    backend: Callable[[], PolycubeTilingProblem] = dlinks.Root,
 ) -> PolycubeTilingProblem:
-    dancing_links: PolycubeTilingProblem = dlinks.Root()
+    dancing_links: PolycubeTilingProblem = backend()
     for cube in box.cubes:
         dancing_links.add_constraint(cube.to_tuple())
     for piece in piece_positions:
@@ -52,9 +58,17 @@ def _initialise_dancing_links(
     return dancing_links
 
 
-def prepare_problem(
+def generate_placements(
     box: polyc.Polycube, pieces: Iterable[polyc.Polycube]
+) -> set[polyc.Polycube]:
+    all_orientations = define_all_piece_orientations(pieces)
+    return _generate_piece_positions(box, all_orientations)
+
+
+def prepare_problem(
+    box: polyc.Polycube,
+    pieces: Iterable[polyc.Polycube],
+    backend: Callable[[], PolycubeTilingProblem] = dlinks.Root,
 ) -> PolycubeTilingProblem:
-    all_orientations = _define_all_piece_orientations(pieces)
-    positions = _generate_piece_positions(box, all_orientations)
-    return _initialise_dancing_links(box, positions)
+    placements = generate_placements(box, pieces)
+    return initialise_dancing_links(box, placements, backend)
@@ -0,0 +1,75 @@
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+import polycube as polyc
+
+COLOR_LIST = [
+    "red",
+    "orange",
+    "yellow",
+    "green",
+    "cyan",
+    "blue",
+    "purple",
+    "magenta",
+    "brown",
+    "white",
+    "black",
+]
+
+
+def label_volume(polycubes: Iterable[polyc.Polycube]) -> np.ndarray:
+    # 0 marks an empty cell, and i + 1 a cell of the i-th polycube.
+    cells: list[tuple[int, int, int]] = []
+    sizes: list[int] = []
+    for polycube in polycubes:
+        cells.extend(cube.to_tuple() for cube in polycube.cubes)
+        sizes.append(len(polycube.cubes))
+    return label_volume_from_cells(np.array(cells, dtype=np.intp), sizes)
+
+
+def label_volume_from_cells(cells: np.ndarray, sizes: Sequence[int]) -> np.ndarray:
+    if len(cells) == 0:
+        return np.zeros((0, 0, 0), dtype=np.int16)
+    labels = np.repeat(np.arange(1, len(sizes) + 1), sizes)
+    volume: np.ndarray = np.zeros(tuple(cells.max(axis=0) + 1), dtype=np.int16)
+    volume[tuple(cells.T)] = labels
+    return volume
+
+
+def label_character(i: int) -> str:
+    if i == 0:
+        return "."
+    elif 1 <= i <= 26:
+        return chr(ord("a") + i - 1)
+    elif 27 <= i <= 52:
+        return chr(ord("A") + i - 27)
+    elif 53 <= i <= 62:
+        return chr(ord("0") + i - 53)
+    else:
+        return chr(192 + i - 63)
+
+
+def layers_text(volume: np.ndarray) -> str:
+    num_labels = int(volume.max(initial=0)) + 1
+    characters = np.array([label_character(i) for i in range(num_labels)])
+    lines = []
+    for i, layer in enumerate(characters[volume]):
+        lines.append(f"Layer {i}")
+        lines.extend("".join(row) for row in layer)
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def voxel_colors(volume: np.ndarray) -> np.ndarray:
+    colors = np.array([None] + COLOR_LIST, dtype=object)
+    num_colors = len(COLOR_LIST)
+    face_colors: np.ndarray = colors[
+        np.where(volume > 0, (volume - 1) % num_colors + 1, 0)
+    ]
+    return face_colors
+
+
+def draw_voxels(ax, volume: np.ndarray) -> None:
+    ax.voxels(volume > 0, facecolors=voxel_colors(volume), edgecolors="k")
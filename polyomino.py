@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import unittest
-from itertools import product, zip_longest
+from itertools import permutations, product, zip_longest
 
 from typing import TYPE_CHECKING
 
@@ -56,7 +56,7 @@ class Polyomino:
         return isinstance(other, Polyomino) and self.squares == other.squares
 
     def __hash__(self) -> int:
-        return hash(tuple(self.squares))
+        return hash(frozenset(self.squares))
 
     def translate_to_origin(self) -> Polyomino:
         x_min = Polyomino.MAX_XY
@@ -163,6 +163,14 @@ class PolyominoTests(unittest.TestCase):
         expected = Polyomino([Square(0, 0), Square(0, 1), Square(-1, 1), Square(-1, 2)])
         self.assertEqual(actual, expected)
 
+    def test_equal_polyominos_hash_equally(self) -> None:
+        coords = [(0, 1), (1, 0), (1, 1), (2, 1)]
+        polyominos = {
+            Polyomino([Square(x, y) for (x, y) in order])
+            for order in permutations(coords)
+        }
+        self.assertEqual(len(polyominos), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
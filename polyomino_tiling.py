@@ -1,13 +1,15 @@
 import functools
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 
 import dancing_links_root as dlinks
 import polyomino as polym
+import tracing
 
 PolyominoTilingProblem = dlinks.Root[tuple[int, int], polym.Polyomino]
 
 
-def _define_all_piece_orientations(
+@tracing.traced()
+def define_all_piece_orientations(
     polyominos: Iterable[polym.Polyomino],
 ) -> set[polym.Polyomino]:
     res = set()
@@ -37,14 +39,18 @@ def _generate_piece_positions(
 ) -> set[polym.Polyomino]:
     positions: set[polym.Polyomino] = set()
     for piece in pieces:
-        positions.update(polym.generate_positions(board, piece))
+        with tracing.span("generate_positions", cells=len(piece.squares)):
+            positions.update(polym.generate_positions(board, piece))
     return positions
 
 
-def _initialise_dancing_links(
-    board: polym.Polyomino, piece_positions: Iterable[polym.Polyomino]
+@tracing.traced()
+def initialise_dancing_links(
+    board: polym.Polyomino,
+    piece_positions: Iterable[polym.Polyomino],
+    backend: Callable[[], PolyominoTilingProblem] = dlinks.Root,
 ) -> PolyominoTilingProblem:
-    dancing_links: PolyominoTilingProblem = dlinks.Root()
+    dancing_links: PolyominoTilingProblem = backend()
     for sq in board.squares:
         dancing_links.add_constraint(sq.to_tuple())
     for piece in piece_positions:
@@ -52,9 +58,17 @@ def _initialise_dancing_links(
     return dancing_links
 
 
-def prepare_problem(
+def generate_placements(
     board: polym.Polyomino, pieces: Iterable[polym.Polyomino]
+) -> set[polym.Polyomino]:
+    all_orientations = define_all_piece_orientations(pieces)
+    return _generate_piece_positions(board, all_orientations)
+
+
+def prepare_problem(
+    board: polym.Polyomino,
+    pieces: Iterable[polym.Polyomino],
+    backend: Callable[[], PolyominoTilingProblem] = dlinks.Root,
 ) -> PolyominoTilingProblem:
-    all_orientations = _define_all_piece_orientations(pieces)
-    positions = _generate_piece_positions(board, all_orientations)
-    return _initialise_dancing_links(board, positions)
+    placements = generate_placements(board, pieces)
+    return initialise_dancing_links(board, placements, backend)
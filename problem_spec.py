@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import unittest
+from collections.abc import Callable, Iterable, Sequence
+from itertools import product
+from typing import Any, Union, cast
+
+import bitset_solver as bitset
+import dancing_cells as dcells
+import dancing_links_root as dlinks
+import polycube as polyc
+import polycube_tiling as polyc_tiling
+import polyomino as polym
+import polyomino_tiling as polym_tiling
+
+Coordinates = tuple[int, ...]
+Shape = Union[polyc.Polycube, polym.Polyomino]
+
+# Exact cover engines, all with the interface of dancing_links_root.Root.
+BACKENDS: dict[str, Callable[[], Any]] = {
+    "links": dlinks.Root,
+    "cells": dcells.DancingCellsRoot,
+    "bits": bitset.BitsetRoot,
+}
+
+# Pieces are defined flat in the xy plane, and lifted to z = 0 for 3D boards.
+NAMED_PIECES: dict[str, tuple[tuple[int, int], ...]] = {
+    "I": ((0, 0), (1, 0), (2, 0), (3, 0)),
+    "O": ((0, 0), (1, 0), (0, 1), (1, 1)),
+    "T": ((0, 0), (1, 0), (2, 0), (1, 1)),
+    "L": ((0, 0), (1, 0), (2, 0), (0, 1)),
+    "S": ((0, 0), (1, 0), (1, 1), (2, 1)),
+    "I3": ((0, 0), (1, 0), (2, 0)),
+    "L3": ((0, 0), (1, 0), (0, 1)),
+    "D": ((0, 0), (1, 0)),
+}
+
+
+def parse_dimensions(spec: str) -> tuple[int, ...]:
+    try:
+        dimensions = tuple(int(n) for n in spec.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid board dimensions: {spec!r}") from None
+    if len(dimensions) not in (2, 3) or any(n <= 0 for n in dimensions):
+        raise ValueError(f"Invalid board dimensions: {spec!r}")
+    return dimensions
+
+
+def parse_board(spec: str | Iterable[Sequence[int]]) -> list[Coordinates]:
+    if isinstance(spec, str):
+        return list(product(*(range(n) for n in parse_dimensions(spec))))
+    return [tuple(cell) for cell in spec]
+
+
+def parse_piece(spec: str | Iterable[Sequence[int]], dimension: int) -> list[Coordinates]:
+    cells: list[Coordinates]
+    if isinstance(spec, str):
+        if spec.upper() not in NAMED_PIECES:
+            raise ValueError(f"Unknown piece: {spec!r}")
+        cells = list(NAMED_PIECES[spec.upper()])
+    else:
+        cells = [tuple(cell) for cell in spec]
+    if any(len(cell) > dimension for cell in cells):
+        raise ValueError(f"Piece {spec!r} does not fit a {dimension}D board")
+    return [cell + (0,) * (dimension - len(cell)) for cell in cells]
+
+
+class ProblemSpec:
+    def __init__(
+        self, board: Iterable[Coordinates], pieces: Iterable[Iterable[Coordinates]]
+    ) -> None:
+        self.board: tuple[Coordinates, ...] = tuple(sorted(set(board)))
+        self.pieces: tuple[tuple[Coordinates, ...], ...] = tuple(
+            tuple(sorted(set(piece))) for piece in pieces
+        )
+        if len(self.board) == 0:
+            raise ValueError("Board is empty")
+        dimensions = {len(cell) for cell in self.board}
+        dimensions.update(len(cell) for piece in self.pieces for cell in piece)
+        if len(dimensions) != 1 or not dimensions <= {2, 3}:
+            raise ValueError("Board and pieces must all be 2D or all be 3D")
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, ProblemSpec) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __str__(self) -> str:
+        return f"ProblemSpec({len(self.board)} cells, {len(self.pieces)} pieces)"
+
+    @classmethod
+    def parse(
+        cls, board: str | Iterable[Sequence[int]], pieces: Iterable[Any]
+    ) -> ProblemSpec:
+        cells = parse_board(board)
+        dimension = len(cells[0]) if cells else 0
+        return cls(cells, (parse_piece(piece, dimension) for piece in pieces))
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> ProblemSpec:
+        return cls.parse(data["board"], data["pieces"])
+
+    @property
+    def dimension(self) -> int:
+        return len(self.board[0])
+
+    def key(self) -> tuple[tuple[Coordinates, ...], tuple[tuple[Coordinates, ...], ...]]:
+        return (self.board, self.pieces)
+
+    def board_shape(self) -> Shape:
+        return to_shape(self.board)
+
+    def piece_shapes(self) -> list[Shape]:
+        return [to_shape(piece) for piece in self.pieces]
+
+    def generate_placements(self) -> list[Shape]:
+        board = self.board_shape()
+        if isinstance(board, polyc.Polycube):
+            polycubes = cast(list[polyc.Polycube], self.piece_shapes())
+            return list(polyc_tiling.generate_placements(board, polycubes))
+        polyominos = cast(list[polym.Polyomino], self.piece_shapes())
+        return list(polym_tiling.generate_placements(board, polyominos))
+
+    def build_problem(
+        self, placements: Iterable[Shape] | None = None, backend: str = "links"
+    ) -> dlinks.Root:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend!r}")
+        # The board and pieces are all polycubes or all polyominos (see __init__).
+        board = self.board_shape()
+        if isinstance(board, polyc.Polycube):
+            if placements is None:
+                return polyc_tiling.prepare_problem(
+                    board,
+                    cast(list[polyc.Polycube], self.piece_shapes()),
+                    BACKENDS[backend],
+                )
+            return polyc_tiling.initialise_dancing_links(
+                board, cast(Iterable[polyc.Polycube], placements), BACKENDS[backend]
+            )
+        if placements is None:
+            return polym_tiling.prepare_problem(
+                board,
+                cast(list[polym.Polyomino], self.piece_shapes()),
+                BACKENDS[backend],
+            )
+        return polym_tiling.initialise_dancing_links(
+            board, cast(Iterable[polym.Polyomino], placements), BACKENDS[backend]
+        )
+
+
+def to_shape(cells: Iterable[Coordinates]) -> Shape:
+    cells = list(cells)
+    if len(cells) > 0 and len(cells[0]) == 2:
+        return polym.Polyomino(polym.Square(x, y) for (x, y) in cells)
+    return polyc.Polycube(polyc.Cube(x, y, z) for (x, y, z) in cells)
+
+
+def shape_cells(shape: Shape) -> list[Coordinates]:
+    if isinstance(shape, polyc.Polycube):
+        return sorted(cube.to_tuple() for cube in shape.cubes)
+    return sorted(sq.to_tuple() for sq in shape.squares)
+
+
+class BackendParityTests(unittest.TestCase):
+    def test_knuth_example(self) -> None:
+        for name, backend in BACKENDS.items():
+            with self.subTest(backend=name):
+                root = backend()
+                for c in "ABCDEFG":
+                    root.add_constraint(c)
+                for e in ("CEF", "ADG", "BCF", "AD", "BG", "DEG"):
+                    root.add_item(e, e)
+                solutions = root.solve()
+                self.assertEqual(solutions.size, 1)
+                self.assertEqual(set(solutions[0]), {"AD", "BG", "CEF"})
+
+    def test_backends_find_the_same_solutions(self) -> None:
+        for board, pieces in (("4x4", ["L"]), ("4x2x2", ["O"]), ("5x4", ["L", "T"])):
+            problem = ProblemSpec.parse(board, pieces)
+            links = problem.build_problem(backend="links")
+            expected = sorted(sorted(s.rows) for s in links.solve())
+            for name in BACKENDS:
+                with self.subTest(board=board, backend=name):
+                    root = problem.build_problem(links.items, backend=name)
+                    self.assertEqual(
+                        sorted(sorted(s.rows) for s in root.solve()), expected
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import argparse
+import unittest
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from math import prod
+from typing import cast
+
+import polycube as polyc
+import polycube_tiling as polyc_tiling
+import polyomino as polym
+import polyomino_tiling as polym_tiling
+import problem_spec as spec
+
+# Placements of one piece orientation, as (number of slices spanned, bitmask of
+# cells covered relative to the placement's first cell).
+Placement = tuple[int, int]
+
+# By default, states with transitions still to compute are split across workers
+# only if there are at least this many, as each costs little next to sending it to
+# a process.
+MIN_PARALLEL_STATES = 256
+
+
+def _orientations(
+    pieces: Iterable[Sequence[spec.Coordinates]],
+) -> list[list[spec.Coordinates]]:
+    shapes = [spec.to_shape(piece) for piece in pieces]
+    if len(shapes) == 0:
+        return []
+    orientations: Iterable[spec.Shape]
+    if len(spec.shape_cells(shapes[0])[0]) == 3:
+        orientations = polyc_tiling.define_all_piece_orientations(
+            cast(list[polyc.Polycube], shapes)
+        )
+    else:
+        orientations = polym_tiling.define_all_piece_orientations(
+            cast(list[polym.Polyomino], shapes)
+        )
+    return [spec.shape_cells(orientation) for orientation in orientations]
+
+
+# Counts tilings of boxes which are long in their first axis, slice by slice along
+# it. Cells are numbered slice by slice, and the board is filled in that order,
+# always placing a piece on the first empty cell. The state between cells is then
+# the occupancy of the cells ahead (the "profile") that earlier pieces stick into,
+# as a bitmask with bit 0 for the next cell.
+#
+# Away from the far end of the box, every slice looks the same, so the transfer
+# from a profile at the start of a slice to the profiles at the start of the next
+# slice is memoized; after the first few slices, counting a longer box costs only
+# a multiplication of the profile counts by these transfers per slice.
+class ProfileCounter:
+    def __init__(
+        self,
+        cross_section: Sequence[int],
+        pieces: Iterable[Sequence[spec.Coordinates]],
+        num_workers: int | None = None,
+        min_parallel_states: int = MIN_PARALLEL_STATES,
+    ) -> None:
+        self.cross_section = tuple(cross_section)
+        self.slice_size = prod(self.cross_section)
+        self.num_workers = num_workers
+        self.min_parallel_states = min_parallel_states
+        cross_cells = list(product(*(range(n) for n in self.cross_section)))
+        cross_index = {cell: i for i, cell in enumerate(cross_cells)}
+        self.placements: list[list[Placement]] = [[] for _ in cross_cells]
+        self.max_extent = 1
+        for cells in _orientations(pieces):
+            if len(cells[0]) != len(self.cross_section) + 1:
+                raise ValueError(
+                    "Pieces must have one more axis than the cross section"
+                )
+            # The first cell of an orientation in numbering order is its lexicographic
+            # minimum, as cells are numbered in lexicographic order.
+            anchor = min(cells)
+            offsets = [tuple(n - a for (n, a) in zip(cell, anchor)) for cell in cells]
+            extent = max(offset[0] for offset in offsets) + 1
+            self.max_extent = max(self.max_extent, extent)
+            for i, cross_cell in enumerate(cross_cells):
+                mask = 0
+                for offset in offsets:
+                    target = tuple(n + d for (n, d) in zip(cross_cell, offset[1:]))
+                    j = cross_index.get(target, None)
+                    if j is None:
+                        break
+                    mask |= 1 << (offset[0] * self.slice_size + j - i)
+                else:
+                    self.placements[i].append((extent, mask))
+        self.transfers: dict[tuple[int, int], dict[int, int]] = {}
+
+    def __str__(self) -> str:
+        return (
+            f"ProfileCounter(cross section {self.cross_section}, "
+            f"{len(self.transfers)} transfers memoized)"
+        )
+
+    def count(self, length: int) -> int:
+        counts: dict[int, int] = {0: 1}
+        executor = None
+        if self.num_workers is not None and self.num_workers > 1:
+            executor = ProcessPoolExecutor(
+                self.num_workers,
+                initializer=_initialise_worker,
+                initargs=(self.placements,),
+            )
+        try:
+            for i in range(length):
+                # Near the far end, pieces have fewer slices left to reach into.
+                remaining = min(length - i, self.max_extent)
+                self._compute_transfers(counts, remaining, executor)
+                next_counts: defaultdict[int, int] = defaultdict(int)
+                for state, num_ways in counts.items():
+                    for next_state, num_transfers in self.transfers[
+                        (state, remaining)
+                    ].items():
+                        next_counts[next_state] += num_ways * num_transfers
+                counts = next_counts
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return counts.get(0, 0)
+
+    def _compute_transfers(
+        self,
+        states: Iterable[int],
+        remaining: int,
+        executor: ProcessPoolExecutor | None,
+    ) -> None:
+        missing = [s for s in states if (s, remaining) not in self.transfers]
+        if executor is not None and len(missing) >= self.min_parallel_states:
+            chunk_size = -(-len(missing) // (4 * (self.num_workers or 1)))
+            chunks = [
+                missing[i : i + chunk_size] for i in range(0, len(missing), chunk_size)
+            ]
+            results = executor.map(
+                _worker_transfers, chunks, [remaining] * len(chunks)
+            )
+            for chunk, transfers in zip(chunks, results):
+                for state, transfer in zip(chunk, transfers):
+                    self.transfers[(state, remaining)] = transfer
+        else:
+            for state in missing:
+                self.transfers[(state, remaining)] = slice_transfer(
+                    self.placements, state, remaining
+                )
+
+
+def slice_transfer(
+    placements: Sequence[Sequence[Placement]], state: int, remaining: int
+) -> dict[int, int]:
+    counts: dict[int, int] = {state: 1}
+    for cell_placements in placements:
+        next_counts: defaultdict[int, int] = defaultdict(int)
+        for profile, num_ways in counts.items():
+            if profile & 1:
+                next_counts[profile >> 1] += num_ways
+                continue
+            for extent, mask in cell_placements:
+                if extent <= remaining and not profile & mask:
+                    next_counts[(profile | mask) >> 1] += num_ways
+        counts = next_counts
+    return dict(counts)
+
+
+_worker_placements: list[list[Placement]] = []
+
+
+def _initialise_worker(placements: list[list[Placement]]) -> None:
+    global _worker_placements
+    _worker_placements = placements
+
+
+def _worker_transfers(states: list[int], remaining: int) -> list[dict[int, int]]:
+    return [slice_transfer(_worker_placements, state, remaining) for state in states]
+
+
+def count_tilings(
+    dimensions: Sequence[int],
+    pieces: Iterable[Sequence[spec.Coordinates]],
+    long_axis: int | None = None,
+    num_workers: int | None = None,
+) -> int:
+    if long_axis is None:
+        long_axis = max(range(len(dimensions)), key=lambda i: dimensions[i])
+    # Move the long axis first, permuting the pieces' axes along with the box's so
+    # that chiral pieces keep their handedness relative to the box.
+    axes = [long_axis] + [i for i in range(len(dimensions)) if i != long_axis]
+    permuted_pieces = [
+        [tuple(cell[axis] for axis in axes) for cell in piece] for piece in pieces
+    ]
+    counter = ProfileCounter(
+        [dimensions[axis] for axis in axes[1:]], permuted_pieces, num_workers
+    )
+    return counter.count(dimensions[long_axis])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Count tilings of long boxes by transfer matrices."
+    )
+    parser.add_argument("cross_section", help='e.g. "2x2" for 2x2xN boxes')
+    parser.add_argument("pieces", nargs="+", help="piece names such as O")
+    parser.add_argument("-n", "--lengths", type=int, nargs="+", default=[10])
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+    cross_section = spec.parse_dimensions(f"1x{args.cross_section}")[1:]
+    dimension = len(cross_section) + 1
+    pieces = [spec.parse_piece(piece, dimension) for piece in args.pieces]
+    counter = ProfileCounter(cross_section, pieces, args.workers)
+    for length in args.lengths:
+        print(f"Length {length}: {counter.count(length)} tilings")
+
+
+class ProfileCountingTests(unittest.TestCase):
+    def _assert_matches_dancing_links(self, board: str, pieces: list[str]) -> None:
+        problem = spec.ProblemSpec.parse(board, pieces)
+        self.assertEqual(
+            count_tilings(spec.parse_dimensions(board), problem.pieces),
+            problem.build_problem().solve().size,
+        )
+
+    def test_o_tetrominos_in_4x2x2_box(self) -> None:
+        from problems.o_tetrominos_in_4x2x2_box import o_tetrominos_in_4x2x2_box
+
+        expected = o_tetrominos_in_4x2x2_box().solve().size
+        o_tetromino = spec.parse_piece("O", 3)
+        self.assertEqual(count_tilings((4, 2, 2), [o_tetromino]), expected)
+
+    def test_l_tetrominos_in_4x4_board(self) -> None:
+        self._assert_matches_dancing_links("4x4", ["L"])
+
+    def test_matches_dancing_links(self) -> None:
+        self._assert_matches_dancing_links("5x8", ["L"])
+        self._assert_matches_dancing_links("4x6", ["L", "T"])
+        self._assert_matches_dancing_links("2x2x10", ["O"])
+        self._assert_matches_dancing_links("2x3x4", ["L"])
+        self._assert_matches_dancing_links("3x2x4", ["S", "L3"])
+
+    def test_counter_is_reusable_across_lengths(self) -> None:
+        counter = ProfileCounter((2, 2), [spec.parse_piece("O", 3)])
+        counts = [counter.count(length) for length in range(2, 12, 2)]
+        # 2x2x2N boxes of O tetrominos follow a(N) = 5a(N-1) - 4a(N-2).
+        self.assertEqual(counts, [3, 11, 43, 171, 683])
+
+    def test_parallel_transfers(self) -> None:
+        counter = ProfileCounter(
+            (5,), [spec.parse_piece("L", 2)], num_workers=2, min_parallel_states=2
+        )
+        self.assertEqual(counter.count(8), 436)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Any, Literal
+
+import numpy as np
+
+import dancing_links_root as dlinks
+import problem_spec as spec
+
+# Row matrices hold one solution per row, padded with PADDING where solutions
+# have fewer pieces than the longest one.
+PADDING = -1
+
+MmapMode = Literal["r+", "r", "w+", "c"]
+
+
+def to_row_matrix(solutions: dlinks.Solutions) -> np.ndarray:
+    rows = np.frombuffer(solutions.rows, dtype=np.uint32).astype(np.int32)
+    offsets = np.frombuffer(solutions.offsets, dtype=np.uint64).astype(np.int64)
+    lengths = np.diff(offsets)
+    width = int(lengths.max()) if len(lengths) > 0 else 0
+    if len(lengths) > 0 and np.all(lengths == width):
+        reshaped: np.ndarray = rows.reshape(len(lengths), width)
+        return reshaped
+    matrix: np.ndarray = np.full((len(lengths), width), PADDING, dtype=np.int32)
+    columns = np.arange(len(rows)) - np.repeat(offsets[:-1], lengths)
+    matrix[np.repeat(np.arange(len(lengths)), lengths), columns] = rows
+    return matrix
+
+
+def to_placement_table(
+    items: Sequence[Any],
+    cells_of: Callable[[Any], Iterable[spec.Coordinates]] = spec.shape_cells,
+) -> tuple[np.ndarray, np.ndarray]:
+    placement_cells = [list(cells_of(item)) for item in items]
+    offsets: np.ndarray = np.zeros(len(placement_cells) + 1, dtype=np.int64)
+    np.cumsum([len(cells) for cells in placement_cells], out=offsets[1:])
+    cells = np.array(
+        [cell for cells in placement_cells for cell in cells], dtype=np.int16
+    )
+    return cells, offsets
+
+
+def save_rows(path: str | Path, solutions: dlinks.Solutions) -> None:
+    np.save(path, to_row_matrix(solutions))
+
+
+def load_rows(path: str | Path, mmap_mode: MmapMode | None = "r") -> np.ndarray:
+    rows: np.ndarray = np.load(path, mmap_mode=mmap_mode)
+    return rows
+
+
+# A bundle is a directory of .npy files: the row matrix and the placement table
+# it refers to, so that all of them can be memory-mapped.
+def save_solutions(path: str | Path, solutions: dlinks.Solutions) -> None:
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    cells, offsets = to_placement_table(solutions.items)
+    np.save(directory / "rows.npy", to_row_matrix(solutions))
+    np.save(directory / "placement_cells.npy", cells)
+    np.save(directory / "placement_offsets.npy", offsets)
+
+
+def load_solutions(
+    path: str | Path,
+    items: Sequence[Any] | None = None,
+    mmap_mode: MmapMode | None = "r",
+) -> StoredSolutions:
+    # A bundle carries its own placement table. A bare .npy row matrix only holds
+    # row numbers, so it must be decoded against the items of the problem that
+    # made it, in the same order.
+    directory = Path(path)
+    if directory.is_dir():
+        return StoredSolutions(
+            load_rows(directory / "rows.npy", mmap_mode),
+            PlacementTable(
+                load_rows(directory / "placement_cells.npy", mmap_mode),
+                load_rows(directory / "placement_offsets.npy", mmap_mode),
+            ),
+        )
+    if items is None:
+        raise ValueError("Items are required to decode a bare row matrix")
+    return StoredSolutions(load_rows(path, mmap_mode), items)
+
+
+class PlacementTable(Sequence[spec.Shape]):
+    def __init__(self, cells: np.ndarray, offsets: np.ndarray) -> None:
+        self.cells = cells
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return spec.to_shape(map(tuple, self.cells[start:end].tolist()))
+
+
+class StoredSolutions:
+    def __init__(self, rows: np.ndarray, items: Sequence[Any]) -> None:
+        self.rows = rows
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[dlinks.Solution]:
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, i: int) -> dlinks.Solution:
+        rows = self.rows[i]
+        return dlinks.Solution(rows[rows != PADDING].tolist(), self.items)
+
+
+class SolutionStorageTests(unittest.TestCase):
+    def setUp(self) -> None:
+        problem = spec.ProblemSpec.parse("4x4", ["L"]).build_problem()
+        self.items = problem.items
+        self.solutions = problem.solve()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _assert_same_solutions(self, actual: Iterable[dlinks.Solution]) -> None:
+        def cells(solutions: Iterable[dlinks.Solution]) -> list[list[Any]]:
+            return [sorted(map(spec.shape_cells, solution)) for solution in solutions]
+
+        self.assertEqual(cells(actual), cells(self.solutions))
+
+    def test_row_matrix_round_trip(self) -> None:
+        path = Path(self.directory.name) / "rows.npy"
+        save_rows(path, self.solutions)
+        stored = load_solutions(path, self.items)
+        self.assertIsInstance(stored.rows, np.memmap)
+        self._assert_same_solutions(stored)
+
+    def test_bundle_round_trip(self) -> None:
+        path = Path(self.directory.name) / "solutions"
+        save_solutions(path, self.solutions)
+        stored = load_solutions(path)
+        self.assertIsInstance(stored.rows, np.memmap)
+        assert isinstance(stored.items, PlacementTable)
+        self.assertIsInstance(stored.items.cells, np.memmap)
+        self._assert_same_solutions(stored)
+
+    def test_ragged_solutions_are_padded(self) -> None:
+        solutions = dlinks.Solutions(
+            [dlinks.Solution([0, 1, 2], "abc"), dlinks.Solution([1], "abc")]
+        )
+        np.testing.assert_array_equal(
+            to_row_matrix(solutions), [[0, 1, 2], [1, PADDING, PADDING]]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
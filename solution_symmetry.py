@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import unittest
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from hashlib import blake2b
+from itertools import permutations, product
+from typing import Any, Generic, TypeVar, cast
+
+import problem_spec as spec
+
+T = TypeVar("T")
+S = TypeVar("S", bound=Iterable)
+
+Coordinates = tuple[int, ...]
+CellPermutation = tuple[int, ...]
+
+
+def board_symmetries(board: Iterable[Coordinates]) -> list[CellPermutation]:
+    # Each symmetry is given as a permutation of the board's cells (indexed in
+    # sorted order), taking cell i to cell perm[i].
+    cells = sorted(set(board))
+    if len(cells) == 0:
+        return []
+    cell_set = set(cells)
+    index = {cell: i for i, cell in enumerate(cells)}
+    dimension = len(cells[0])
+    symmetries: set[CellPermutation] = set()
+    for axes in permutations(range(dimension)):
+        for signs in product((1, -1), repeat=dimension):
+            images = [
+                tuple(sign * cell[axis] for (axis, sign) in zip(axes, signs))
+                for cell in cells
+            ]
+            offsets = [min(image[i] for image in images) for i in range(dimension)]
+            images = [
+                tuple(n - offset for (n, offset) in zip(image, offsets))
+                for image in images
+            ]
+            if cell_set.issuperset(images):
+                symmetries.add(tuple(index[image] for image in images))
+    return sorted(symmetries)
+
+
+def placement_symmetries(
+    board: Iterable[Coordinates], placements: Iterable[Iterable[Coordinates]]
+) -> list[CellPermutation]:
+    # The board symmetries which map every placement to a placement. Only these map
+    # solutions to solutions: with a chiral piece, the mirror images of its
+    # placements are not placements, so reflections of the board are left out.
+    cells = sorted(set(board))
+    index = {cell: i for i, cell in enumerate(cells)}
+    placement_set = {
+        frozenset(index[tuple(cell)] for cell in placement) for placement in placements
+    }
+    return [
+        perm
+        for perm in board_symmetries(cells)
+        if all(
+            frozenset(perm[i] for i in placement) in placement_set
+            for placement in placement_set
+        )
+    ]
+
+
+class SymmetryClass:
+    def __init__(self, orbit_size: int) -> None:
+        self.orbit_size = orbit_size
+        self.num_seen = 0
+
+    def __str__(self) -> str:
+        return f"SymmetryClass(orbit size: {self.orbit_size}, seen: {self.num_seen})"
+
+
+class SymmetryDeduplicator(Generic[T]):
+    DIGEST_SIZE = 16
+
+    def __init__(
+        self,
+        board: Iterable[Coordinates],
+        cells_of: Callable[[T], Iterable[Coordinates]] | None = None,
+        placements: Iterable[Iterable[Coordinates]] | None = None,
+    ) -> None:
+        self.cells: list[Coordinates] = sorted(set(board))
+        self.cells_of = (
+            cast(Callable[[T], Iterable[Coordinates]], spec.shape_cells)
+            if cells_of is None
+            else cells_of
+        )
+        self._index = {cell: i for i, cell in enumerate(self.cells)}
+        # Without the problem's placements, every symmetry of the board is assumed
+        # to map solutions to solutions, which only holds if no piece is chiral.
+        symmetries = (
+            board_symmetries(self.cells)
+            if placements is None
+            else placement_symmetries(self.cells, placements)
+        )
+        # Store inverse permutations, so a relabelled solution is a simple gather.
+        self._inverse_symmetries: list[list[int]] = []
+        for perm in symmetries:
+            inverse = [0] * len(perm)
+            for i, j in enumerate(perm):
+                inverse[j] = i
+            self._inverse_symmetries.append(inverse)
+        # Only a fixed-size digest of each canonical form is kept, so memory grows
+        # with the number of distinct classes rather than the number of solutions.
+        self.classes: dict[bytes, SymmetryClass] = {}
+        self.num_seen = 0
+
+    def __str__(self) -> str:
+        return (
+            f"SymmetryDeduplicator({self.num_classes} classes from "
+            f"{self.num_seen} solutions, group order {self.group_order})"
+        )
+
+    @property
+    def group_order(self) -> int:
+        return len(self._inverse_symmetries)
+
+    @property
+    def num_classes(self) -> int:
+        return len(self.classes)
+
+    def orbit_sizes(self) -> list[int]:
+        return [symmetry_class.orbit_size for symmetry_class in self.classes.values()]
+
+    def add(self, solution: Iterable[T]) -> bool:
+        self.num_seen += 1
+        images = self._images(self._label(solution))
+        key = blake2b(min(images), digest_size=self.DIGEST_SIZE).digest()
+        symmetry_class = self.classes.get(key, None)
+        is_new = symmetry_class is None
+        if symmetry_class is None:
+            symmetry_class = SymmetryClass(len(set(images)))
+            self.classes[key] = symmetry_class
+        symmetry_class.num_seen += 1
+        return is_new
+
+    def unique(self, solutions: Iterable[S]) -> Iterator[S]:
+        for solution in solutions:
+            if self.add(solution):
+                yield solution
+
+    def _label(self, solution: Iterable[T]) -> list[int]:
+        labels = [-1] * len(self.cells)
+        for i, piece in enumerate(solution):
+            for cell in self.cells_of(piece):
+                labels[self._index[tuple(cell)]] = i
+        return labels
+
+    def _images(self, labels: Sequence[int]) -> list[bytes]:
+        # Relabel pieces in order of first appearance, so that the labelling is
+        # independent of the order in which the pieces were chosen.
+        typecode = "B" if len(self.cells) < 256 else "I"
+        images = []
+        for inverse in self._inverse_symmetries:
+            relabelling: dict[int, int] = {}
+            images.append(
+                array(
+                    typecode,
+                    [
+                        relabelling.setdefault(labels[i], len(relabelling))
+                        for i in inverse
+                    ],
+                ).tobytes()
+            )
+        return images
+
+
+class SymmetryDeduplicatorTests(unittest.TestCase):
+    def _deduplicate(self, board: str, pieces: list[Any]) -> SymmetryDeduplicator:
+        problem = spec.ProblemSpec.parse(board, pieces)
+        root = problem.build_problem()
+        deduplicator: SymmetryDeduplicator = SymmetryDeduplicator(
+            problem.board, placements=map(spec.shape_cells, root.items)
+        )
+        for _ in deduplicator.unique(root.generate_solutions()):
+            pass
+        return deduplicator
+
+    def test_square_board_symmetries(self) -> None:
+        self.assertEqual(len(board_symmetries(spec.parse_board("4x4"))), 8)
+        self.assertEqual(len(board_symmetries(spec.parse_board("4x3"))), 4)
+
+    def test_cube_box_symmetries(self) -> None:
+        self.assertEqual(len(board_symmetries(spec.parse_board("3x3x3"))), 48)
+        self.assertEqual(len(board_symmetries(spec.parse_board("4x2x2"))), 16)
+
+    def test_orbits_partition_l_tetromino_tilings(self) -> None:
+        deduplicator = self._deduplicate("4x4", ["L"])
+        self.assertEqual(deduplicator.num_seen, 10)
+        self.assertEqual(sum(deduplicator.orbit_sizes()), 10)
+        self.assertEqual(sorted(deduplicator.orbit_sizes()), [2, 4, 4])
+
+    def test_orbits_partition_o_tetromino_tilings(self) -> None:
+        deduplicator = self._deduplicate("4x2x2", ["O"])
+        self.assertEqual(deduplicator.num_seen, 11)
+        self.assertEqual(sum(deduplicator.orbit_sizes()), 11)
+
+    def test_orbits_partition_chiral_tetracube_tilings(self) -> None:
+        # Mirror images of tilings by a chiral piece are not tilings, so only the
+        # rotations of the box count.
+        chiral_tetracube = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (1, 1, 1)]
+        deduplicator = self._deduplicate("2x2x4", [chiral_tetracube])
+        self.assertEqual(deduplicator.group_order, 8)
+        self.assertEqual(deduplicator.num_seen, 36)
+        self.assertEqual(sum(deduplicator.orbit_sizes()), 36)
+
+
+if __name__ == "__main__":
+    unittest.main()
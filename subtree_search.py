@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import unittest
+from collections.abc import Iterable
+
+import dancing_links_root as dlinks
+from dancing_links_nodes import ColumnHeader, DataObject
+
+
+# A subtree of the search tree: the one below the rows of prefix, without the
+# subtrees below any of the exclusions (longer prefixes), which have been handed on
+# as units of their own.
+class WorkUnit:
+    def __init__(
+        self, prefix: Iterable[int], exclusions: Iterable[Iterable[int]] = ()
+    ) -> None:
+        self.prefix: tuple[int, ...] = tuple(prefix)
+        self.exclusions: list[tuple[int, ...]] = [tuple(e) for e in exclusions]
+
+    def __str__(self) -> str:
+        return f"WorkUnit({list(self.prefix)}, {len(self.exclusions)} exclusions)"
+
+    def to_message(self) -> tuple[tuple[int, ...], list[tuple[int, ...]]]:
+        return (self.prefix, self.exclusions)
+
+
+class _Level:
+    __slots__ = ("column", "rows", "index", "depth", "chosen")
+
+    def __init__(
+        self, column: ColumnHeader, rows: list[DataObject], depth: int
+    ) -> None:
+        self.column = column
+        self.rows = rows
+        self.index = 0
+        self.depth = depth
+        self.chosen: DataObject | None = None
+
+
+# Searches a work unit on a Root the way Root._search does, but with the search
+# stack held explicitly, so that it can be paused after a number of nodes and can
+# give away the untried rows at its shallowest level as new work units.
+class SubtreeSearch:
+    def __init__(
+        self, root: dlinks.Root, unit: WorkUnit, store_solutions: bool = False
+    ) -> None:
+        self.root = root
+        self.unit = unit
+        self.store_solutions = store_solutions
+        self.exclusions = set(unit.exclusions)
+        self.max_exclusion_depth = max((len(e) for e in self.exclusions), default=0)
+        self.path = list(unit.prefix)
+        self.levels: list[_Level] = []
+        self.num_nodes = 0
+        self.num_solutions = 0
+        self.solutions: list[list[int]] = []
+        self.num_selected = root.select_rows(unit.prefix)
+        self.finished = False
+        if self.num_selected < len(unit.prefix):
+            self._finish()
+        else:
+            self._enter()
+
+    def __str__(self) -> str:
+        return (
+            f"SubtreeSearch({self.unit}, {self.num_nodes} nodes, "
+            f"{self.num_solutions} solutions)"
+        )
+
+    def _enter(self) -> None:
+        column = self.root.smallest_column()
+        if column is None:
+            self.num_solutions += 1
+            if self.store_solutions:
+                self.solutions.append(list(self.path))
+            return
+        column.cover()
+        rows = self.root.column_rows(column)
+        self.levels.append(_Level(column, rows, len(self.path)))
+
+    def _is_excluded(self, row: int) -> bool:
+        return (
+            len(self.path) < self.max_exclusion_depth
+            and (*self.path, row) in self.exclusions
+        )
+
+    def run(self, max_nodes: int | None = None) -> bool:
+        # Returns whether the subtree is finished.
+        levels = self.levels
+        path = self.path
+        num_nodes = 0
+        while levels:
+            level = levels[-1]
+            if level.chosen is not None:
+                row = level.chosen
+                node = row.left
+                while node is not row:
+                    node.column.uncover()
+                    node = node.left
+                path.pop()
+                level.chosen = None
+            if level.index == len(level.rows):
+                level.column.uncover()
+                levels.pop()
+                continue
+            if max_nodes is not None and num_nodes >= max_nodes:
+                self.num_nodes += num_nodes
+                return False
+            row = level.rows[level.index]
+            level.index += 1
+            if self.exclusions and self._is_excluded(row.row):
+                continue
+            node = row.right
+            while node is not row:
+                node.column.cover()
+                node = node.right
+            level.chosen = row
+            path.append(row.row)
+            num_nodes += 1
+            self._enter()
+        self.num_nodes += num_nodes
+        self._finish()
+        return True
+
+    def split(self) -> list[WorkUnit]:
+        # Give away the later half of the untried rows at the shallowest level
+        # which has any, as these head the largest untried subtrees.
+        for level in self.levels:
+            num_untried = len(level.rows) - level.index
+            if num_untried == 0:
+                continue
+            given = level.rows[len(level.rows) - (num_untried + 1) // 2 :]
+            del level.rows[len(level.rows) - len(given) :]
+            prefix = tuple(self.path[: level.depth])
+            units = []
+            for row in given:
+                unit_prefix = (*prefix, row.row)
+                if unit_prefix in self.exclusions:
+                    continue
+                exclusions = [
+                    e for e in self.exclusions if e[: len(unit_prefix)] == unit_prefix
+                ]
+                units.append(WorkUnit(unit_prefix, exclusions))
+            if units:
+                return units
+        return []
+
+    def close(self) -> None:
+        # Unwind a search stopped part way, restoring the matrix.
+        for level in reversed(self.levels):
+            if level.chosen is not None:
+                row = level.chosen
+                node = row.left
+                while node is not row:
+                    node.column.uncover()
+                    node = node.left
+            level.column.uncover()
+        self.levels.clear()
+        self._finish()
+
+    def _finish(self) -> None:
+        if not self.finished:
+            self.root.deselect_rows(self.unit.prefix[: self.num_selected])
+            self.finished = True
+
+
+class SubtreeSearchTests(unittest.TestCase):
+    def test_split_subtrees_cover_search(self) -> None:
+        import problem_spec as spec
+
+        root = spec.ProblemSpec.parse("5x8", ["L"]).build_problem()
+        constraint_sizes = [c.size for c in root.constraints.values()]
+        pending = [WorkUnit(())]
+        solutions = []
+        while pending:
+            search = SubtreeSearch(root, pending.pop(), store_solutions=True)
+            while not search.run(50):
+                pending.extend(search.split())
+            solutions.extend(search.solutions)
+        self.assertEqual(len(solutions), 436)
+        self.assertEqual(len({tuple(sorted(s)) for s in solutions}), 436)
+        self.assertEqual([c.size for c in root.constraints.values()], constraint_sizes)
+
+    def test_close_restores_matrix(self) -> None:
+        import problem_spec as spec
+
+        root = spec.ProblemSpec.parse("4x6", ["L", "T"]).build_problem()
+        search = SubtreeSearch(root, WorkUnit([0]))
+        search.run(10)
+        search.close()
+        self.assertEqual(root.solve().size, 76)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,7 @@
-from collections.abc import Callable
+import subprocess
+import sys
+from collections.abc import Callable, Iterable
+from pathlib import Path
 from typing import Any
 
 import dancing_links_root as dlinks
@@ -6,19 +9,74 @@ from timing_decorator import time_execution
 
 
 @time_execution
-def measure_solve_time(problem: dlinks.Root) -> Any:
-    return problem.solve()
+def measure_solve_time(
+    problem: dlinks.Root, max_num_solutions: int | None = None
+) -> Any:
+    return problem.solve(max_num_solutions)
 
 
 def time_n_solves(
-    label: str, initialise_problem: Callable[..., dlinks.Root], num_iterations: int
+    label: str,
+    initialise_problem: Callable[..., dlinks.Root],
+    num_iterations: int,
+    max_num_solutions: int | None = None,
 ) -> None:
     solve_times = []
     for _ in range(num_iterations):
         problem = initialise_problem()
-        (_, t) = measure_solve_time(problem)
+        (_, t) = measure_solve_time(problem, max_num_solutions)
         solve_times.append(t)
     total_time = sum(solve_times)
     print(f"Solved {label} {num_iterations} times.")
     print(f"Total time: {total_time:.4f}")
     print(f"Average time: {(total_time / num_iterations):.4f}")
+
+
+def compare_backends(
+    label: str,
+    initialise_problem: Callable[[str], Any],
+    backends: Iterable[str],
+    num_iterations: int,
+    max_num_solutions: int | None = None,
+) -> dict[str, float]:
+    average_times = {}
+    for backend in backends:
+        solve_times = []
+        for _ in range(num_iterations):
+            problem = initialise_problem(backend)
+            (_, t) = measure_solve_time(problem, max_num_solutions)
+            solve_times.append(t)
+        average_times[backend] = sum(solve_times) / num_iterations
+    fastest_time = min(average_times.values())
+    print(f"Solved {label} {num_iterations} times with each backend.")
+    for backend, average_time in average_times.items():
+        print(
+            f"  {backend}: average time {average_time:.4f} "
+            f"({average_time / fastest_time:.2f}x fastest)"
+        )
+    return average_times
+
+
+def time_import(module: str) -> float:
+    # Imports are timed in a fresh interpreter, so that nothing is cached already.
+    code = (
+        "import time; start_time = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start_time)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=Path(__file__).parent,
+        text=True,
+    )
+    return float(result.stdout)
+
+
+def time_imports(modules: Iterable[str], num_iterations: int) -> None:
+    for module in modules:
+        import_times = [time_import(module) for _ in range(num_iterations)]
+        print(
+            f"Imported {module} {num_iterations} times, "
+            f"average time: {(sum(import_times) / num_iterations):.4f}"
+        )
@@ -1,6 +1,6 @@
 from collections.abc import Callable
 from functools import wraps
-from time import time
+from time import perf_counter
 from typing import ParamSpec, TypeVar
 
 
@@ -11,9 +11,9 @@ R = TypeVar("R")
 def time_execution(f: Callable[P, R]) -> Callable[P, tuple[R, float]]:
     @wraps(f)
     def wrap(*args: P.args, **kwargs: P.kwargs) -> tuple[R, float]:
-        start_time = time()
+        start_time = perf_counter()
         result = f(*args, **kwargs)
-        end_time = time()
+        end_time = perf_counter()
         elapsed_time = end_time - start_time
         return (result, elapsed_time)
 
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import unittest
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from functools import wraps
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, ParamSpec, TypeVar
+
+# Setting this to a file name before starting traces the whole run, writes the
+# trace there on exit and prints a summary to stderr; setting it to 1 only traces.
+TRACE_ENV_VAR = "TILING_TRACE"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Events are Chrome trace "complete" events, with times in microseconds.
+Event = dict[str, Any]
+
+_enabled = False
+_events: list[Event] = []
+_local = threading.local()
+
+
+def _stack() -> list[Span]:
+    try:
+        stack: list[Span] = _local.stack
+    except AttributeError:
+        stack = _local.stack = []
+    return stack
+
+
+class Span:
+    __slots__ = ("name", "args", "start", "child_time")
+
+    def __init__(self, name: str, args: dict[str, Any]) -> None:
+        self.name = name
+        self.args = args
+        self.start = 0
+        self.child_time = 0
+
+    def __enter__(self) -> Span:
+        _stack().append(self)
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        duration = perf_counter_ns() - self.start
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_time += duration
+        # perf_counter_ns is a system-wide monotonic clock on Linux, so events from
+        # worker processes line up with the parent's.
+        _events.append(
+            {
+                "name": self.name,
+                "ph": "X",
+                "ts": self.start / 1000,
+                "dur": duration / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": dict(self.args, self_time=(duration - self.child_time) / 1000),
+            }
+        )
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **args: Any) -> Span | _NullSpan:
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, args)
+
+
+def traced(name: str | None = None) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    def decorator(f: Callable[P, R]) -> Callable[P, R]:
+        label = name or f"{f.__module__}.{f.__qualname__}"
+
+        @wraps(f)
+        def wrap(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _enabled:
+                return f(*args, **kwargs)
+            with Span(label, {}):
+                return f(*args, **kwargs)
+
+        return wrap
+
+    return decorator
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+    # Worker processes started afresh (rather than forked) read the environment.
+    os.environ.setdefault(TRACE_ENV_VAR, "1")
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+    os.environ.pop(TRACE_ENV_VAR, None)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def drain_events() -> list[Event]:
+    events = list(_events)
+    _events.clear()
+    return events
+
+
+def add_events(events: Iterable[Event]) -> None:
+    _events.extend(events)
+
+
+# Work sent to a process pool is traced by submitting traced_call(function, ...)
+# instead of function(...), and passing each result through merge, which moves the
+# worker's events into this process.
+def traced_call(function: Callable[..., R], *args: Any) -> tuple[R, list[Event]]:
+    result = function(*args)
+    return (result, drain_events())
+
+
+def merge(outcome: tuple[R, list[Event]]) -> R:
+    (result, events) = outcome
+    add_events(events)
+    return result
+
+
+def _reset_after_fork() -> None:
+    # A forked worker starts with a copy of the parent's events, which are the
+    # parent's to report.
+    _events.clear()
+    _local.stack = []
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def export_chrome_trace(path: str | Path, events: list[Event] | None = None) -> None:
+    # Loads in chrome://tracing and https://ui.perfetto.dev.
+    import json
+
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "traceEvents": _events if events is None else events,
+                "displayTimeUnit": "ms",
+            },
+            f,
+        )
+
+
+def summary_table(events: list[Event] | None = None) -> str:
+    calls: defaultdict[str, int] = defaultdict(int)
+    total_times: defaultdict[str, float] = defaultdict(float)
+    self_times: defaultdict[str, float] = defaultdict(float)
+    for event in _events if events is None else events:
+        calls[event["name"]] += 1
+        total_times[event["name"]] += event["dur"]
+        self_times[event["name"]] += event["args"]["self_time"]
+    width = max((len(name) for name in calls), default=4)
+    lines = [
+        f"{'Span':<{width}}  {'Calls':>8}  {'Total (ms)':>12}  {'Self (ms)':>12}"
+        f"  {'Mean (ms)':>12}"
+    ]
+    for name in sorted(calls, key=lambda name: -self_times[name]):
+        lines.append(
+            f"{name:<{width}}  {calls[name]:>8}  {total_times[name] / 1000:>12.3f}"
+            f"  {self_times[name] / 1000:>12.3f}"
+            f"  {total_times[name] / calls[name] / 1000:>12.3f}"
+        )
+    return "\n".join(lines)
+
+
+def _write_trace_at_exit(path: str) -> None:
+    export_chrome_trace(path)
+    print(summary_table(), file=sys.stderr)
+    print(f"Trace written to {path}", file=sys.stderr)
+
+
+def _configure_from_environment() -> None:
+    value = os.environ.get(TRACE_ENV_VAR, "")
+    if value in ("", "0"):
+        return
+    import atexit
+    import multiprocessing
+
+    enable()
+    # Worker processes inherit the variable too, but only the main process writes.
+    if value != "1" and multiprocessing.parent_process() is None:
+        atexit.register(_write_trace_at_exit, value)
+
+
+_configure_from_environment()
+
+
+def _count_to(n: int) -> int:
+    with span("count_to", n=n):
+        return sum(1 for _ in range(n))
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.was_enabled = is_enabled()
+        enable()
+        drain_events()
+
+    def tearDown(self) -> None:
+        if not self.was_enabled:
+            disable()
+        drain_events()
+
+    def test_nested_spans(self) -> None:
+        with span("outer"):
+            with span("inner", i=1):
+                pass
+            with span("inner", i=2):
+                pass
+        events = drain_events()
+        self.assertEqual([e["name"] for e in events], ["inner", "inner", "outer"])
+        (inner1, inner2, outer) = events
+        self.assertLessEqual(outer["ts"], inner1["ts"])
+        self.assertAlmostEqual(
+            outer["args"]["self_time"],
+            outer["dur"] - inner1["dur"] - inner2["dur"],
+            places=3,
+        )
+        self.assertEqual(inner2["args"]["i"], 2)
+        self.assertIn("inner", summary_table(events))
+
+    def test_disabled(self) -> None:
+        disable()
+        with span("ignored"):
+            pass
+        self.assertEqual(drain_events(), [])
+
+    def test_traced_decorator(self) -> None:
+        traced_sum = traced("sum")(sum)
+        self.assertEqual(traced_sum([1, 2]), 3)
+        self.assertEqual([e["name"] for e in drain_events()], ["sum"])
+
+    def test_events_from_workers(self) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+
+        with span("parent"):
+            pass
+        with ProcessPoolExecutor(2) as executor:
+            counts = list(
+                map(merge, executor.map(partial(traced_call, _count_to), [10, 20]))
+            )
+        self.assertEqual(counts, [10, 20])
+        events = drain_events()
+        self.assertEqual(
+            sorted(e["name"] for e in events), ["count_to", "count_to", "parent"]
+        )
+        worker_events = [e for e in events if e["name"] == "count_to"]
+        self.assertTrue(all(e["pid"] != os.getpid() for e in worker_events))
+
+    def test_export_chrome_trace(self) -> None:
+        import json
+        import tempfile
+
+        with span("exported"):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "trace.json"
+            export_chrome_trace(path)
+            trace = json.loads(path.read_text())
+        self.assertEqual(trace["traceEvents"][0]["name"], "exported")
+        self.assertEqual(trace["traceEvents"][0]["ph"], "X")
+
+
+if __name__ == "__main__":
+    unittest.main()